@@ -0,0 +1,40 @@
+# Учёт активности пользователей для фонового обслуживания базы данных.
+#
+# Каждое обновление только отмечает пользователя в словаре в памяти, а в базу
+# уходит одна строка на пользователя при периодическом сбросе, поэтому поток
+# сообщений не превращается в поток записей.
+from datetime import datetime
+
+from aiogram import types
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+
+class ActivityMiddleware(BaseMiddleware):
+    def __init__(self, on_first_seen=None):
+        # on_first_seen(user_id) — корутина, вызываемая при первом сообщении пользователя
+        # с момента запуска бота (или с момента, как пользователь был забыт через forget)
+        super().__init__()
+        self.on_first_seen = on_first_seen
+        self.last_seen = {}  # user_id -> дата последней активности в UTC (ISO), ещё не записанная в базу
+        self.languages = {}  # user_id -> код языка из последнего сообщения пользователя
+        self.known_users = set()
+
+    async def on_pre_process_message(self, message: types.Message, data: dict):
+        user_id = message.from_user.id
+        self.last_seen[user_id] = datetime.utcnow().date().isoformat()
+        if message.from_user.language_code:
+            self.languages[user_id] = message.from_user.language_code
+        if user_id not in self.known_users:
+            self.known_users.add(user_id)
+            if self.on_first_seen is not None:
+                await self.on_first_seen(user_id)
+
+    # забрать накопленные отметки активности для записи в базу
+    def drain(self):
+        last_seen, self.last_seen = self.last_seen, {}
+        return last_seen
+
+    def forget(self, user_ids):
+        self.known_users.difference_update(user_ids)
+        for user_id in user_ids:
+            self.languages.pop(user_id, None)
@@ -0,0 +1,389 @@
+# Нагрузочный тест бота расписания на локальном mock-сервере Bot API.
+#
+# Запуск:
+#   python benchmark.py --users 10000 --output bench.json
+#
+# Скрипт поднимает mock-сервер Telegram Bot API, запускает диспетчер из
+# class_schedule.py в режиме long polling против этого сервера, прогоняет
+# синтетических пользователей через /add, /view, /edit и /delete, после чего
+# заполняет таблицу subscriptions так, чтобы все уведомления пришлись на одну
+# минуту, и замеряет задержку доставки. Отдельно считается, сколько вызовов API
+# тратит один /view на больших расписаниях. Результат выводится в формате JSON.
+#
+# Каждый шаг сценария проверяется по ответу бота, а после сценариев — по содержимому
+# базы; если хотя бы один сценарий сломался, скрипт завершается с ненулевым кодом.
+# Ограничение частоты запросов на время теста отключается, а клиенты AWS
+# (определение сентимента) заменяются заглушками, поэтому тест не ходит в AWS.
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+MOCK_HOST = '127.0.0.1'
+BOT_TOKEN = '123456:benchmark'
+
+
+# функция для вычисления перцентиля (метод ближайшего ранга)
+def percentile(values, p):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+    return ordered[k]
+
+
+# функция для сводки по набору замеров в миллисекундах
+def summarize(values):
+    return {
+        'count': len(values),
+        'p50': percentile(values, 50),
+        'p99': percentile(values, 99),
+        'max': max(values) if values else None,
+    }
+
+
+# mock-сервер Telegram Bot API: отдаёт синтетические обновления через getUpdates
+# и запоминает все исходящие вызовы бота
+class MockTelegramServer:
+    def __init__(self):
+        self.updates = asyncio.Queue()
+        self.calls = Counter()
+        self.sent = []  # (время получения, chat_id, метод)
+        self.replies = defaultdict(list)  # chat_id -> тексты исходящих сообщений
+        self.message_id = 0
+        self.update_id = 0
+
+    def push_update(self, user_id, text):
+        self.update_id += 1
+        self.message_id += 1
+        user = {'id': user_id, 'is_bot': False, 'first_name': f'user{user_id}'}
+        self.updates.put_nowait({
+            'update_id': self.update_id,
+            'message': {
+                'message_id': self.message_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'from': user,
+                'text': text,
+                'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(text)}] if text.startswith('/') else [],
+            },
+        })
+        return self.update_id
+
+    async def handle(self, request):
+        method = request.match_info['method'].lower()
+        data = await request.post()
+        self.calls[method] += 1
+        if method == 'getupdates':
+            result = await self.get_updates(int(data.get('limit', 100)), float(data.get('timeout', 0) or 0))
+        elif method == 'getme':
+            result = {'id': 123456, 'is_bot': True, 'first_name': 'benchmark', 'username': 'benchmark_bot'}
+        elif method.startswith('send'):
+            chat_id = int(data['chat_id'])
+            self.sent.append((time.perf_counter(), chat_id, method))
+            self.replies[chat_id].append(data.get('text') or data.get('caption') or '')
+            self.message_id += 1
+            result = {
+                'message_id': self.message_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'text': data.get('text', ''),
+            }
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    async def get_updates(self, limit, timeout):
+        batch = []
+        try:
+            batch.append(await asyncio.wait_for(self.updates.get(), timeout or 0.1))
+        except asyncio.TimeoutError:
+            return batch
+        while len(batch) < limit and not self.updates.empty():
+            batch.append(self.updates.get_nowait())
+        return batch
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, MOCK_HOST, 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f'http://{MOCK_HOST}:{port}'
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+# промежуточный слой, который отмечает момент окончания обработки каждого обновления
+def make_timing_middleware(bot_module, finished):
+    from aiogram.dispatcher.middlewares import BaseMiddleware
+
+    class TimingMiddleware(BaseMiddleware):
+        async def on_post_process_update(self, update, results, data):
+            waiter = finished.pop(update.update_id, None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(time.perf_counter())
+
+    return TimingMiddleware()
+
+
+# заглушка клиентов boto3 для определения сентимента: считает вызовы и не обращается к AWS
+class StubAwsClient:
+    def __init__(self):
+        self.calls = 0
+
+    def detect_dominant_language(self, Text):
+        self.calls += 1
+        return {'Languages': [{'LanguageCode': 'en'}]}
+
+    def detect_sentiment(self, Text, LanguageCode):
+        self.calls += 1
+        return {'Sentiment': 'NEUTRAL'}
+
+    def translate_text(self, Text, SourceLanguageCode, TargetLanguageCode):
+        self.calls += 1
+        return {'TranslatedText': Text}
+
+
+# отключение ограничения частоты запросов: синтетические пользователи шлют сообщения без пауз
+def disable_throttling(bot_module):
+    from throttling import Limit, ThrottlingMiddleware
+
+    unlimited = Limit(rate=1e9, burst=1e9)
+    for middleware in bot_module.dp.middleware.applications:
+        if isinstance(middleware, ThrottlingMiddleware):
+            middleware.default_limit = unlimited
+            middleware.command_limits = {}
+            middleware.state_limits = {}
+
+
+# сценарий одного синтетического пользователя: /add, /view, /edit, /delete.
+# Каждый шаг — (команда для статистики, текст сообщения, фрагмент ожидаемого ответа бота).
+# Пользователь без language_code получает русский интерфейс, поэтому кнопки — на русском.
+def user_script(week_day, lesson_index):
+    from localization import week_day_title
+
+    title = week_day_title(week_day)
+    lesson = f'Lesson {lesson_index}'
+    edited = f'Edited {lesson_index}'
+    return [
+        ('/add', '/add', 'На какой день недели добавляем занятие?'),
+        ('/add', title, 'Введите занятие'),
+        ('/add', f'9:50, {lesson}, Teacher T.T., 101', 'Занятие успешно добавлено!'),
+        ('/add', 'Назад', 'Выберите действие:'),  # выход из цикла добавления занятий
+        ('/view', '/view', f'9:50 - {lesson}'),
+        ('/edit', '/edit', 'Выберите день недели для редактирования занятия:'),
+        ('/edit', title, 'Выберите занятие для редактирования:'),
+        ('/edit', f'9:50 - {lesson} ({title})', 'Введите новые детали занятия'),
+        ('/edit', f'10:40, {edited}, Teacher T.T., 102', 'Занятие успешно обновлено!'),
+        ('/delete', '/delete', 'Выберите день недели:'),
+        ('/delete', title, 'Выберите опцию удаления:'),
+        ('/delete', 'Удалить занятие', 'Выберите занятие для удаления:'),
+        ('/delete', f'10:40 - {edited} ({title})', 'Занятие удалено.'),
+    ]
+
+
+async def run_user(server, finished, user_id, script, latencies, failures, semaphore):
+    async with semaphore:
+        for command, text, expected in script:
+            waiter = asyncio.get_running_loop().create_future()
+            first_reply = len(server.replies[user_id])
+            started = time.perf_counter()
+            update_id = server.push_update(user_id, text)
+            finished[update_id] = waiter
+            done_at = await waiter
+            latencies[command].append((done_at - started) * 1000)
+            replies = server.replies[user_id][first_reply:]
+            if not any(expected in reply for reply in replies):
+                # после сломанного шага остальные шаги сценария теряют смысл
+                failures.append({'user_id': user_id, 'text': text, 'expected': expected, 'replies': replies})
+                return
+
+
+# фаза 1: интерактивные сценарии пользователей
+async def bench_interactive(server, finished, users, concurrency, seed):
+    import aiosqlite
+    from localization import SCHOOL_DAYS, WEEK_DAYS
+
+    rnd = random.Random(seed)
+    week_days = WEEK_DAYS[:SCHOOL_DAYS]
+
+    latencies = defaultdict(list)
+    failures = []
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_user(server, finished, 1_000_000 + i, user_script(rnd.choice(week_days), i), latencies, failures, semaphore)
+        for i in range(users)
+    ))
+    duration = time.perf_counter() - started
+
+    # все сценарии заканчиваются удалением занятия, поэтому у пользователей не должно остаться занятий
+    async with aiosqlite.connect('schedule.db') as db:
+        cursor = await db.execute('SELECT count(*) FROM schedule WHERE user_id BETWEEN ? AND ?', (1_000_000, 1_000_000 + users - 1))
+        leftover_lessons = (await cursor.fetchone())[0]
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        'users': users,
+        'concurrency': concurrency,
+        'updates': len(all_latencies),
+        'duration_s': duration,
+        'updates_per_second': len(all_latencies) / duration if duration else None,
+        'latency_ms': summarize(all_latencies),
+        'latency_ms_by_command': {command: summarize(values) for command, values in sorted(latencies.items())},
+        'failed_users': len(failures),
+        'failures_sample': failures[:5],
+        'leftover_lessons': leftover_lessons,
+    }
+
+
+# фаза 2: все подписки приходятся на одну минуту рассылки
+async def bench_notifications(bot_module, server, subscribers):
+    import aiosqlite
+    from localization import WEEK_DAYS
+
+    # не начинаем рассылку на границе минуты, иначе часть подписок выпадет из текущей минуты
+    if datetime.utcnow().second >= 50:
+        await asyncio.sleep(61 - datetime.utcnow().second)
+    utc_now = datetime.utcnow()
+    notification_time = utc_now.strftime('%H:%M')
+    tomorrow = WEEK_DAYS[(utc_now + timedelta(days=1)).weekday()]
+
+    async with aiosqlite.connect('schedule.db') as db:
+        await db.executemany(
+            'INSERT OR REPLACE INTO subscriptions (user_id, active, notification_time, timezone) VALUES (?, 1, ?, ?)',
+            ((2_000_000 + i, notification_time, '0') for i in range(subscribers))
+        )
+        await db.executemany(
+            'INSERT INTO schedule (user_id, week_day, lesson_time, lesson_name, teacher_name, classroom) VALUES (?, ?, ?, ?, ?, ?)',
+            ((2_000_000 + i, tomorrow, '9:50', f'Lesson {i}', 'Teacher T.T.', '101') for i in range(subscribers))
+        )
+        await db.commit()
+
+    first_sent = len(server.sent)
+    started = time.perf_counter()
+    await bot_module.check_and_send_notifications()
+    duration = time.perf_counter() - started
+
+    lags = [(sent_at - started) * 1000 for sent_at, _, _ in server.sent[first_sent:]]
+    return {
+        'subscriptions': subscribers,
+        'delivered': len(lags),
+        'duration_s': duration,
+        'deliveries_per_second': len(lags) / duration if duration else None,
+        'delivery_lag_ms': summarize(lags),
+    }
+
+
+# фаза 3: сколько вызовов API тратит один /view на больших расписаниях
+async def bench_view_api_calls(server, finished, sizes):
+    import aiosqlite
+    from localization import SCHOOL_DAYS, WEEK_DAYS
+
+    week_days = WEEK_DAYS[:SCHOOL_DAYS]
+
+    results = []
+    for size in sizes:
+        user_id = 3_000_000 + size
+        async with aiosqlite.connect('schedule.db') as db:
+            await db.executemany(
+                'INSERT INTO schedule (user_id, week_day, lesson_time, lesson_name, teacher_name, classroom) VALUES (?, ?, ?, ?, ?, ?)',
+                ((user_id, week_days[i % 6], f'{8 + i % 12}:{i % 60:02d}', f'Lesson {i}', 'Teacher T.T.', str(100 + i)) for i in range(size))
+            )
+            await db.commit()
+
+        first_sent = len(server.sent)
+        waiter = asyncio.get_running_loop().create_future()
+        started = time.perf_counter()
+        finished[server.push_update(user_id, '/view')] = waiter
+        done_at = await waiter
+        calls = Counter(method for _, chat_id, method in server.sent[first_sent:] if chat_id == user_id)
+        results.append({
+            'lessons': size,
+            'api_calls': sum(calls.values()),
+            'api_calls_by_method': dict(sorted(calls.items())),
+            'latency_ms': (done_at - started) * 1000,
+        })
+    return results
+
+
+async def main(args):
+    workdir = tempfile.mkdtemp(prefix='schedule-bench-')
+    os.chdir(workdir)  # бот работает с schedule.db в текущем каталоге
+    os.environ['API_TOKEN'] = BOT_TOKEN
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from aiogram.bot.api import TelegramAPIServer
+    import class_schedule
+
+    server = MockTelegramServer()
+    base_url = await server.start()
+    class_schedule.bot.server = TelegramAPIServer.from_base(base_url)
+
+    aws_stub = StubAwsClient()
+    class_schedule.comprehend_client = class_schedule.translate_client = aws_stub
+    disable_throttling(class_schedule)
+
+    finished = {}
+    class_schedule.dp.middleware.setup(make_timing_middleware(class_schedule, finished))
+    await class_schedule.init_db()
+    polling = asyncio.create_task(class_schedule.dp.start_polling(timeout=1, relax=0))
+
+    try:
+        interactive = await bench_interactive(server, finished, args.users, args.concurrency, args.seed)
+        notifications = await bench_notifications(class_schedule, server, args.subscribers or args.users)
+        view = await bench_view_api_calls(server, finished, [int(size) for size in args.view_sizes.split(',') if size])
+    finally:
+        class_schedule.dp.stop_polling()
+        await class_schedule.dp.wait_closed()
+        polling.cancel()
+        await (await class_schedule.bot.get_session()).close()
+        await server.stop()
+
+    return {
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'python': sys.version.split()[0],
+        'seed': args.seed,
+        'interactive': interactive,
+        'notifications': notifications,
+        'view': view,
+        'api_calls': dict(sorted(server.calls.items())),
+        'aws_stub_calls': aws_stub.calls,
+        'workdir': workdir,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Нагрузочный тест бота расписания')
+    parser.add_argument('--users', type=int, default=10000, help='число синтетических пользователей')
+    parser.add_argument('--subscribers', type=int, default=0, help='число подписок в минуте рассылки (по умолчанию равно --users)')
+    parser.add_argument('--concurrency', type=int, default=500, help='число одновременно активных пользователей')
+    parser.add_argument('--view-sizes', default='10,100,500,2000', help='размеры расписаний для подсчёта вызовов API на один /view')
+    parser.add_argument('--seed', type=int, default=0, help='seed генератора случайных чисел')
+    parser.add_argument('--output', help='файл для JSON-отчёта (по умолчанию stdout)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(main(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if report['interactive']['failed_users'] or report['interactive']['leftover_lessons']:
+        sys.exit('Сценарии пользователей завершились с ошибками, см. failures_sample в отчёте.')
@@ -4,29 +4,66 @@ from aiogram.dispatcher import FSMContext
 from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.contrib.middlewares.logging import LoggingMiddleware
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
+from aiogram.utils.exceptions import BotBlocked, BotKicked, CantInitiateConversation, ChatNotFound, UserDeactivated
 import logging
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import aiosqlite
 import aioschedule
 import asyncio
 import boto3
 import random
+import os
+import io
 import pytz
 from response_dictionary import negative_replies, positive_replies, mixed_replies
+from profiler import StackSampler
+from throttling import Limit, TokenBuckets, ThrottlingMiddleware
+from reminders import TimerScheduler
+from replies import ReplyBuilder
+from activity import ActivityMiddleware
+from lesson_calendar import WEEKLY, bitmap_contains, bitmap_covers, build_bitmap, dump_rule, format_rule, load_rule, parse_rule, rule_matches
+from localization import i18n, _, __, WEEK_DAYS, SCHOOL_DAYS, WEEK_DAY_TITLES, resolve_locale, week_day_title, parse_week_day, parse_any_week_day
 
 # Инициализация стороннего API
 comprehend_client = boto3.client("comprehend", region_name="eu-central-1")
 translate_client = boto3.client("translate", region_name="eu-central-1")
 
-# токен бота
-API_TOKEN = 'TOKEN'
+# токен бота (можно передать через переменную окружения API_TOKEN)
+API_TOKEN = os.getenv('API_TOKEN', 'TOKEN')
 
 storage = MemoryStorage() # инициализация хранилища состояний для FSM
 bot = Bot(token=API_TOKEN) # инициализация бота с указанным токеном
 dp = Dispatcher(bot, storage=storage) # инициализация диспетчера для бота с использованием хранилища состояний
 dp.middleware.setup(LoggingMiddleware()) # настройка логирования для бота
+dp.middleware.setup(i18n) # выбор языка сообщений по языку пользователя
 MAX_MESSAGE_LENGTH = 4096  # максимальная длина сообщения для Telegram
 ADMIN_ID = 820288017
+PROFILE_DEFAULT_SECONDS = 30  # длительность профилирования по умолчанию
+PROFILE_MAX_SECONDS = 300  # максимальная длительность профилирования
+BACKUP_DIR = 'backups'  # каталог для снимков базы данных
+BACKUP_PAGES_PER_STEP = 256  # сколько страниц копировать за один шаг резервного копирования
+BACKUP_STEP_SLEEP = 0.01  # пауза между шагами, чтобы не держать блокировку базы
+BACKUP_KEEP_PER_LABEL = 10  # сколько последних снимков хранить для каждой метки
+REMINDER_MINUTES = 15  # за сколько минут до начала занятия присылать напоминание
+SEMESTER_WEEKS = 26  # сколько недель от начала семестра покрывают битовые карты занятий
+MAINTENANCE_HOUR = 3  # час (UTC) наименьшей нагрузки, в который запускается обслуживание базы данных
+STALE_USER_DAYS = 180  # через сколько дней без активности неподписанный пользователь переносится в архив
+VACUUM_PAGES = 1000  # сколько свободных страниц возвращать за один запуск обслуживания
+# ошибки отправки, означающие, что чат пользователя больше недоступен
+UNREACHABLE_CHAT_ERRORS = (BotBlocked, BotKicked, CantInitiateConversation, ChatNotFound, UserDeactivated)
+
+# функция для определения начала текущего семестра, если оно не задано в SEMESTER_START:
+# осенний семестр начинается 1 сентября, весенний — 1 февраля
+def default_semester_start(today=None):
+    today = today or date.today()
+    if today.month >= 9:
+        return date(today.year, 9, 1)
+    if today.month >= 2:
+        return date(today.year, 2, 1)
+    return date(today.year - 1, 9, 1)
+
+# начало семестра для правил повторения (можно передать через переменную окружения SEMESTER_START в формате ДД.ММ.ГГГГ)
+SEMESTER_START = datetime.strptime(os.environ['SEMESTER_START'], '%d.%m.%Y').date() if os.getenv('SEMESTER_START') else default_semester_start()
 
 # определение класса состояний для машины состояний FSM
 class Schedule(StatesGroup):
@@ -51,148 +88,280 @@ class Schedule(StatesGroup):
     deleting_day_schedule = State()
     confirming_day_deletion = State()
     cancelling = State()
-
-# функция, вызываемая при запуске бота
-async def on_startup(dp):
+    choosing_day_for_rules = State()
+    choosing_lesson_for_rules = State()
+    entering_lesson_rules = State()
+
+# лимиты частоты запросов пользователя: Limit(токенов в секунду, ёмкость корзины)
+THROTTLE_DEFAULT_LIMIT = Limit(rate=1.0, burst=10)
+THROTTLE_COMMAND_LIMITS = {
+    'view': Limit(rate=0.2, burst=3),
+    'showdb': Limit(rate=0.1, burst=2),
+    'showsubs': Limit(rate=0.1, burst=2),
+}
+# состояния, в которых некорректный ввод уходит на определение сентимента
+THROTTLE_STATE_LIMITS = {
+    Schedule.week_day_to_add.state: Limit(rate=0.5, burst=5),
+    Schedule.week_day_to_show.state: Limit(rate=0.5, burst=5),
+    Schedule.choosing_day_for_deletion.state: Limit(rate=0.5, burst=5),
+    Schedule.choosing_day_for_rules.state: Limit(rate=0.5, burst=5),
+}
+# обращения к AWS при некорректном вводе: сверх лимита отвечаем заготовленным текстом
+SENTIMENT_LIMIT = Limit(rate=1 / 60, burst=3)
+
+throttling_buckets = TokenBuckets()
+dp.middleware.setup(ThrottlingMiddleware(
+    throttling_buckets, THROTTLE_DEFAULT_LIMIT,
+    command_limits=THROTTLE_COMMAND_LIMITS, state_limits=THROTTLE_STATE_LIMITS,
+    notice_text=__("Слишком много запросов. Пожалуйста, подождите немного.")
+))
+
+# схема таблицы расписания
+SCHEDULE_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS schedule (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER NOT NULL,
+                        week_day TEXT NOT NULL,
+                        lesson_time TEXT NOT NULL,
+                        lesson_name TEXT NOT NULL,
+                        teacher_name TEXT NOT NULL,
+                        classroom TEXT NOT NULL,
+                        FOREIGN KEY(user_id) REFERENCES subscriptions(user_id))'''
+SCHEDULE_INDEX_SQL = 'CREATE INDEX IF NOT EXISTS schedule_user_day ON schedule (user_id, week_day)'
+
+# схема таблицы подписок
+SUBSCRIPTIONS_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS subscriptions (
+                             user_id INTEGER PRIMARY KEY,
+                             active BOOLEAN NOT NULL CHECK (active IN (0, 1)),
+                             notification_time TEXT,
+                             timezone TEXT
+                         )'''
+
+# схема таблицы правил повторения занятий; занятия без правила проводятся каждую неделю
+LESSON_RULES_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS lesson_rules (
+                            lesson_id INTEGER PRIMARY KEY,
+                            week_parity INTEGER NOT NULL,
+                            start_date TEXT,
+                            end_date TEXT,
+                            exceptions TEXT NOT NULL,
+                            semester_start TEXT NOT NULL,
+                            bitmap BLOB NOT NULL,
+                            FOREIGN KEY(lesson_id) REFERENCES schedule(id))'''
+
+# схемы архивных таблиц для занятий и подписок давно неактивных пользователей
+SCHEDULE_ARCHIVE_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS schedule_archive (
+                                id INTEGER PRIMARY KEY,
+                                user_id INTEGER NOT NULL,
+                                week_day TEXT NOT NULL,
+                                lesson_time TEXT NOT NULL,
+                                lesson_name TEXT NOT NULL,
+                                teacher_name TEXT NOT NULL,
+                                classroom TEXT NOT NULL,
+                                archived_at TEXT NOT NULL)'''
+SCHEDULE_ARCHIVE_INDEX_SQL = 'CREATE INDEX IF NOT EXISTS schedule_archive_user ON schedule_archive (user_id)'
+LESSON_RULES_ARCHIVE_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS lesson_rules_archive (
+                                    lesson_id INTEGER PRIMARY KEY,
+                                    week_parity INTEGER NOT NULL,
+                                    start_date TEXT,
+                                    end_date TEXT,
+                                    exceptions TEXT NOT NULL,
+                                    semester_start TEXT NOT NULL,
+                                    bitmap BLOB NOT NULL)'''
+SUBSCRIPTIONS_ARCHIVE_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS subscriptions_archive (
+                                     user_id INTEGER PRIMARY KEY,
+                                     active BOOLEAN NOT NULL,
+                                     notification_time TEXT,
+                                     timezone TEXT,
+                                     archived_at TEXT NOT NULL)'''
+
+# схема таблицы с датой последней активности пользователя
+USER_ACTIVITY_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS user_activity (
+                             user_id INTEGER PRIMARY KEY,
+                             last_seen TEXT NOT NULL,
+                             locale TEXT)'''
+
+# функция для создания таблиц базы данных
+async def init_db():
     async with aiosqlite.connect('schedule.db') as db:
+        # включаем инкрементальную очистку свободных страниц (для существующей базы — однократный VACUUM)
+        cursor = await db.execute('PRAGMA auto_vacuum')
+        if (await cursor.fetchone())[0] != 2:
+            await db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            await db.execute('VACUUM')
         # создание таблицы расписания, если она не существует
-        await db.execute('''CREATE TABLE IF NOT EXISTS schedule (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            user_id INTEGER NOT NULL,
-                            week_day TEXT NOT NULL,
-                            lesson_time TEXT NOT NULL,
-                            lesson_name TEXT NOT NULL,
-                            teacher_name TEXT NOT NULL,
-                            classroom TEXT NOT NULL,
-                            FOREIGN KEY(user_id) REFERENCES subscriptions(user_id))''')
-        
+        await db.execute(SCHEDULE_TABLE_SQL)
+        await db.execute(SCHEDULE_INDEX_SQL)
+        # дни недели, сохранённые через strftime на языке сервера, приводим к названиям из WEEK_DAYS;
+        # нераспознанные значения остаются как есть и пропускаются при выводе расписания
+        cursor = await db.execute('SELECT DISTINCT week_day FROM schedule WHERE week_day NOT IN ({})'.format(', '.join('?' * len(WEEK_DAYS))), WEEK_DAYS)
+        for (week_day,) in await cursor.fetchall():
+            index = parse_any_week_day(week_day)
+            if index is None:
+                logging.warning(f"Не удалось распознать день недели в расписании: {week_day!r}")
+            else:
+                await db.execute('UPDATE schedule SET week_day = ? WHERE week_day = ?', (WEEK_DAYS[index], week_day))
         # Создание таблицы подписок, если она не существует
-        await db.execute('''CREATE TABLE IF NOT EXISTS subscriptions (
-                            user_id INTEGER PRIMARY KEY,
-                            active BOOLEAN NOT NULL CHECK (active IN (0, 1)),
-                            notification_time TEXT,
-                            timezone TEXT
-                        )''')
+        await db.execute(SUBSCRIPTIONS_TABLE_SQL)
+        # Создание таблицы правил повторения занятий, если она не существует
+        await db.execute(LESSON_RULES_TABLE_SQL)
+        await rebuild_lesson_bitmaps(db)
+        # Создание архивных таблиц и таблицы активности, если они не существуют
+        await db.execute(SCHEDULE_ARCHIVE_TABLE_SQL)
+        await db.execute(SCHEDULE_ARCHIVE_INDEX_SQL)
+        await db.execute(LESSON_RULES_ARCHIVE_TABLE_SQL)
+        await db.execute(SUBSCRIPTIONS_ARCHIVE_TABLE_SQL)
+        await db.execute(USER_ACTIVITY_TABLE_SQL)
+        # язык пользователя для рассылки и напоминаний (для таблицы, созданной до его появления)
+        cursor = await db.execute('PRAGMA table_info(user_activity)')
+        if 'locale' not in [column[1] for column in await cursor.fetchall()]:
+            await db.execute('ALTER TABLE user_activity ADD COLUMN locale TEXT')
         await db.commit()
 
+# функция, вызываемая при запуске бота
+async def on_startup(dp):
+    await init_db()
+
     # Запуск планировщика задач
     asyncio.create_task(scheduler())
 
+    # Загрузка напоминаний о занятиях и запуск их планировщика
+    await load_reminders()
+    asyncio.create_task(reminder_scheduler.run())
+
 # клавиатура для главного меню
 main_menu_kb = ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True)
 main_menu_kb.add(KeyboardButton('/add'))
 main_menu_kb.add(KeyboardButton('/delete'))
 main_menu_kb.add(KeyboardButton('/edit'))
 main_menu_kb.add(KeyboardButton('/view'))
+main_menu_kb.add(KeyboardButton('/rules'))
 main_menu_kb.add(KeyboardButton('/notification'))
 
-# клавиатура для возврата в главное меню
-back_to_main_menu_kb = ReplyKeyboardMarkup(resize_keyboard=True).add(KeyboardButton('Назад'))
+# функция для создания клавиатуры для возврата в главное меню
+def get_back_kb():
+    return ReplyKeyboardMarkup(resize_keyboard=True).add(KeyboardButton(_('Назад')))
+
+# функция для получения текста главного меню на языке пользователя
+def main_menu_text():
+    return _("/add — добавить занятие;\n"
+             "/delete — удалить занятие или расписание на день;\n"
+             "/edit — редактировать занятие;\n"
+             "/view — просмотреть расписание;\n"
+             "/rules — чередование недель и отмены занятий;\n"
+             "/notification — подписка на рассылку сообщений с расписанием.\n"
+             "Выберите действие:")
 
 # обработчик команды /start
 @dp.message_handler(commands=['start'], state='*')
 async def start_command(message: types.Message):
-    await message.answer("Привет! Я бот для управления расписанием занятий.\n"
-                         "/add — добавить занятие;\n"
-                         "/delete — удалить занятие или расписание на день;\n"
-                         "/edit — редактировать занятие;\n"
-                         "/view — просмотреть расписание;\n"
-                         "/notification — подписка на рассылку сообщений с расписанием.\n"
-                         "Выберите действие:",
-                         reply_markup=main_menu_kb
-    )
+    await message.answer(_("Привет! Я бот для управления расписанием занятий.") + "\n" + main_menu_text(), reply_markup=main_menu_kb)
     
 # обработчик кнопки "Назад"
-@dp.message_handler(lambda message: message.text == "Назад", state="*")
+@dp.message_handler(lambda message: message.text == _("Назад"), state="*")
 async def back_to_main_menu(message: types.Message, state: FSMContext):
     await state.finish() # сбрасываем состояние
-    await message.answer(
-                         "/add — добавить занятие;\n"
-                         "/delete — удалить занятие или расписание на день;\n"
-                         "/edit — редактировать занятие;\n"
-                         "/view — просмотреть расписание;\n"
-                         "/notification — подписка на рассылку сообщений с расписанием.\n"
-                         "Выберите действие:",
-                         reply_markup=main_menu_kb
-    )
+    await message.answer(main_menu_text(), reply_markup=main_menu_kb)
     
 # функция для создания клавиатуры с днями недели и кнопкой "Назад"
 def get_week_days_kb():
     week_days_kb = ReplyKeyboardMarkup(resize_keyboard=True)
-    week_days_kb.add(KeyboardButton('Назад'))
-    today = datetime.now()
-    monday = today - timedelta(days=today.weekday())
-    for i in range(6):
-        day = monday + timedelta(days=i)
-        button_text = day.strftime("%A")
-        week_days_kb.add(KeyboardButton(button_text))
+    week_days_kb.add(KeyboardButton(_('Назад')))
+    for title in WEEK_DAY_TITLES[resolve_locale()][:SCHOOL_DAYS]:
+        week_days_kb.add(KeyboardButton(title))
     return week_days_kb
 
 # обработчик команды /add для начала процесса добавления расписания
 @dp.message_handler(commands=['add'], state='*')
 async def add_command(message: types.Message):
-    await message.answer("На какой день недели добавляем занятие?", reply_markup=get_week_days_kb())
+    await message.answer(_("На какой день недели добавляем занятие?"), reply_markup=get_week_days_kb())
     await Schedule.week_day_to_add.set()
 
 # обработчик для выбора дня недели при добавлении расписания
 @dp.message_handler(state=Schedule.week_day_to_add)
 async def week_day_chosen(message: types.Message, state: FSMContext):
-    valid_days = get_valid_week_days()
-    if message.text.lower() == "назад":
+    week_day = to_week_day(message.text)
+    if message.text.lower() == _('Назад').lower():
         # логика для кнопки "Назад"
         await state.finish()
-        await message.answer(
-            "/add — добавить занятие;\n"
-            "/delete — удалить занятие или расписание на день;\n"
-            "/edit — редактировать занятие;\n"
-            "/view — просмотреть расписание;\n"
-            "/notification — подписка на рассылку сообщений с расписанием.\n"
-            "Выберите действие:",
-            reply_markup=main_menu_kb
-        )
-    elif not is_valid_week_day(message.text, valid_days):
+        await message.answer(main_menu_text(), reply_markup=main_menu_kb)
+    elif week_day is None:
         await handle_invalid_week_day_input(message)
     else:
         # если день недели корректный, сохраняем его и переходим к следующему шагу
         async with state.proxy() as data:
-            data['week_day'] = message.text
+            data['week_day'] = week_day
         await Schedule.waiting_for_lesson_time.set() # Устанавливаем следующее состояние для ввода времени занятия
 
         # создаем клавиатуру с кнопкой "Назад" для следующего шага
-        back_kb = ReplyKeyboardMarkup(resize_keyboard=True).add(KeyboardButton('Назад'))
         await message.answer(
-            "Введите занятие следующим образом через запятую: время, название предмета, ФИО преподавателя, аудитория.\n"
-            "Пример: 9:50, Защита информации, Меркулов И.А., 420 (К.5)",
-            reply_markup=back_kb
+            _("Введите занятие следующим образом через запятую: время, название предмета, ФИО преподавателя, аудитория.\n"
+              "Пример: 9:50, Защита информации, Меркулов И.А., 420 (К.5)"),
+            reply_markup=get_back_kb()
         )
 
-# функция для проверки дня недели
-def is_valid_week_day(week_day, valid_days):
-    return week_day in valid_days
+# функция для проверки введённого дня недели; возвращает его название для хранения
+# в базе данных (WEEK_DAYS) или None, если день не распознан или в этот день нет занятий
+def to_week_day(text):
+    index = parse_week_day(text)
+    if index is None or index >= SCHOOL_DAYS:
+        return None
+    return WEEK_DAYS[index]
+
+# функция для получения номера дня недели (0 — понедельник) по его названию
+def week_day_index(week_day):
+    return WEEK_DAYS.index(week_day)
+
+# функция для получения даты указанного дня недели на текущей неделе
+def current_week_date(week_day):
+    today = datetime.now().date()
+    return today - timedelta(days=today.weekday()) + timedelta(days=week_day_index(week_day))
+
+# столбцы правила повторения занятия для запросов с LEFT JOIN lesson_rules r
+RULE_COLUMNS = 'r.bitmap, r.week_parity, r.start_date, r.end_date, r.exceptions'
+
+# функция для проверки, проводится ли занятие в указанный день; rule_row — значения RULE_COLUMNS.
+# Внутри окна битовой карты ответ даёт один бит, за его пределами (до начала семестра
+# или после SEMESTER_WEEKS недель) правило проверяется напрямую
+def lesson_happens_on(rule_row, day):
+    bitmap, *rule = rule_row
+    if bitmap is None:
+        return True
+    if bitmap_covers(bitmap, SEMESTER_START, day):
+        return bitmap_contains(bitmap, SEMESTER_START, day)
+    return rule_matches(load_rule(*rule), day.weekday(), day, SEMESTER_START)
+
+# функция для получения строки занятия в расписании
+def lesson_line(lesson_time, lesson_name, teacher_name, classroom, locale=None):
+    return _("{time} - {name}, {teacher}, ауд. {classroom}", locale=locale).format(
+        time=lesson_time, name=lesson_name, teacher=teacher_name, classroom=classroom
+    )
 
-# функция для извлечения допустимых дней недели, нужно для проверки введенного дня недели
-def get_valid_week_days():
-    today = datetime.now()
-    monday = today - timedelta(days=today.weekday())
-    valid_days = []
-    for i in range(6):
-        day = monday + timedelta(days=i)
-        valid_days.append(day.strftime("%A"))
-    return valid_days
+# функция для получения текста кнопки занятия (id, week_day, lesson_time, lesson_name, ...)
+def lesson_button_text(lesson):
+    return f"{lesson[2]} - {lesson[3]} ({week_day_title(lesson[1])})"
+
+# функция для разбора текста кнопки занятия; возвращает время, название и день недели
+def parse_lesson_button(text):
+    lesson_details = text.split(' - ')
+    lesson_time = lesson_details[0].strip()
+    lesson_name, week_day = lesson_details[1].split('(')
+    week_day = to_week_day(week_day.split(')')[0])
+    if week_day is None:
+        raise ValueError(text)
+    return lesson_time, lesson_name.strip(), week_day
 
 
 # обработчик для ввода информации о занятии
 @dp.message_handler(state=Schedule.waiting_for_lesson_time)
 async def lesson_info_chosen(message: types.Message, state: FSMContext):
-    if message.text.lower() == 'назад':
+    if message.text.lower() == _('Назад').lower():
         await state.finish()
-        await message.answer("Выберите действие:", reply_markup=main_menu_kb)
+        await message.answer(_("Выберите действие:"), reply_markup=main_menu_kb)
     else:
         lesson_info = message.text.split(', ')
         if len(lesson_info) != 4:
             await message.answer(
-                "Некорректный ввод. Пожалуйста, следуйте формату и введите данные ещё раз.",
-                reply_markup=back_to_main_menu_kb
+                _("Некорректный ввод. Пожалуйста, следуйте формату и введите данные ещё раз."),
+                reply_markup=get_back_kb()
             )
         else:
             async with state.proxy() as data:
@@ -201,7 +370,7 @@ async def lesson_info_chosen(message: types.Message, state: FSMContext):
             await add_lesson_to_db(state, user_id)
             await state.finish()
             await message.answer(
-                "Занятие успешно добавлено! Хотите добавить еще занятие?",
+                _("Занятие успешно добавлено! Хотите добавить еще занятие?"),
                 reply_markup=get_week_days_kb()
             )
             await Schedule.week_day_to_add.set()
@@ -211,36 +380,38 @@ async def lesson_info_chosen(message: types.Message, state: FSMContext):
 async def add_lesson_to_db(state: FSMContext, user_id: int):
     async with state.proxy() as data:
         async with aiosqlite.connect('schedule.db') as db:
-            await db.execute(
+            cursor = await db.execute(
                 'INSERT INTO schedule (user_id, week_day, lesson_time, lesson_name, teacher_name, classroom) VALUES (?, ?, ?, ?, ?, ?)',
                 (user_id, data['week_day'], data['lesson_time'], data['lesson_name'], data['teacher_name'], data['classroom'])
             )
             await db.commit()
+    await refresh_lesson_reminder(cursor.lastrowid)
 
 # обработчик для команды /edit
 @dp.message_handler(commands=['edit'], state='*')
 async def edit_schedule_command(message: types.Message):
     # предоставляем пользователю выбрать день для редактирования
     week_days_kb = get_week_days_kb()
-    await message.answer("Выберите день недели для редактирования занятия:", reply_markup=week_days_kb)
+    await message.answer(_("Выберите день недели для редактирования занятия:"), reply_markup=week_days_kb)
     await Schedule.choosing_day_for_editing.set()
 
 # обработчик для выбора дня недели при редактировании расписания
 @dp.message_handler(state=Schedule.choosing_day_for_editing)
 async def choose_day_for_editing(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    selected_day = message.text
-    if message.text.lower() == 'назад':
+    selected_day = to_week_day(message.text)
+    if message.text.lower() == _('Назад').lower():
         await state.finish()
-        await message.answer("Выберите действие:", reply_markup=main_menu_kb)
+        await message.answer(_("Выберите действие:"), reply_markup=main_menu_kb)
+    elif selected_day is None:
+        await handle_invalid_week_day_input(message)
     else:
         lessons = await get_lessons_for_user_by_day(user_id, selected_day)
         lessons_kb = ReplyKeyboardMarkup(resize_keyboard=True)
-        lessons_kb.add(KeyboardButton('Назад'))
+        lessons_kb.add(KeyboardButton(_('Назад')))
         for lesson in lessons:
-            button_text = f"{lesson[2]} - {lesson[3]} ({lesson[1]})"
-            lessons_kb.add(KeyboardButton(button_text))
-        await message.answer("Выберите занятие для редактирования:", reply_markup=lessons_kb)
+            lessons_kb.add(KeyboardButton(lesson_button_text(lesson)))
+        await message.answer(_("Выберите занятие для редактирования:"), reply_markup=lessons_kb)
         await Schedule.editing_specific_lesson.set()
 
 # обработчик для ввода новых деталей занятия
@@ -249,8 +420,8 @@ async def update_lesson_details(message: types.Message, state: FSMContext):
     new_lesson_details = message.text.split(', ')
     if len(new_lesson_details) != 4:  # Убедитесь, что введено 4 элемента
         await message.answer(
-            "Некорректный ввод. Пожалуйста, следуйте формату и введите данные еще раз. Формат: 'Время, Название, Преподаватель, Аудитория'.",
-            reply_markup=back_to_main_menu_kb
+            _("Некорректный ввод. Пожалуйста, следуйте формату и введите данные еще раз. Формат: 'Время, Название, Преподаватель, Аудитория'."),
+            reply_markup=get_back_kb()
         )
     else:
         async with state.proxy() as data:
@@ -260,9 +431,9 @@ async def update_lesson_details(message: types.Message, state: FSMContext):
             try:
                 await update_lesson_in_db(lesson_id, week_day, *new_lesson_details)
                 await state.finish()
-                await message.answer("Занятие успешно обновлено!", reply_markup=main_menu_kb)
+                await message.answer(_("Занятие успешно обновлено!"), reply_markup=main_menu_kb)
             except Exception as e:
-                await message.answer(f"Произошла ошибка при обновлении занятия: {e}")
+                await message.answer(_("Произошла ошибка при обновлении занятия: {error}").format(error=e))
 
 # функция для обновления занятия в базе данных
 async def update_lesson_in_db(lesson_id, week_day, lesson_time, lesson_name, teacher_name, classroom):
@@ -272,20 +443,17 @@ async def update_lesson_in_db(lesson_id, week_day, lesson_time, lesson_name, tea
             (week_day, lesson_time, lesson_name, teacher_name, classroom, lesson_id)
         )
         await db.commit()
+    await refresh_lesson_reminder(lesson_id)
 
 # обработчик для выбора конкретного занятия для редактирования
 @dp.message_handler(state=Schedule.editing_specific_lesson)
 async def edit_chosen_lesson(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    if message.text == 'Назад':
+    if message.text == _('Назад'):
         await edit_schedule_command(message)
     else:
         try:
-            lesson_details = message.text.split(' - ')
-            lesson_time = lesson_details[0].strip()
-            lesson_name, week_day = lesson_details[1].split('(')
-            lesson_name = lesson_name.strip()
-            week_day = week_day.split(')')[0].strip()
+            lesson_time, lesson_name, week_day = parse_lesson_button(message.text)
 
             lesson_id = await get_lesson_id_by_details(user_id, lesson_time, lesson_name, week_day)
             if lesson_id is None:
@@ -294,7 +462,7 @@ async def edit_chosen_lesson(message: types.Message, state: FSMContext):
                 # Вывод текущих деталей занятия
                 current_details = await get_lesson_details_by_id(lesson_id)
                 if current_details:
-                    current_details_text = f"Текущие детали занятия: {current_details[0]}, {current_details[1]}, {current_details[2]}, {current_details[3]}"
+                    current_details_text = _("Текущие детали занятия: {0}, {1}, {2}, {3}").format(*current_details)
                     await message.answer(current_details_text)
 
                 # Сохранение lesson_id и week_day в состоянии
@@ -302,88 +470,93 @@ async def edit_chosen_lesson(message: types.Message, state: FSMContext):
                     data['lesson_id'] = lesson_id
                     data['week_day'] = week_day
 
-                await message.answer("Введите новые детали занятия в формате 'Время, Название, Преподаватель, Аудитория'.")
+                await message.answer(_("Введите новые детали занятия в формате 'Время, Название, Преподаватель, Аудитория'."))
                 await Schedule.editing_lesson_details.set()
         except (ValueError, IndexError):
-            await message.answer("Некорректный выбор. Пожалуйста, попробуйте еще раз.")
+            await message.answer(_("Некорректный выбор. Пожалуйста, попробуйте еще раз."))
 
 
 # обработчик для команды /show
 @dp.message_handler(commands=['show'], state='*')
 async def show_schedule(message: types.Message):
     week_days_kb = get_week_days_kb()
-    await message.answer("На какой день показать расписание?", reply_markup=week_days_kb)
+    await message.answer(_("На какой день показать расписание?"), reply_markup=week_days_kb)
     await Schedule.week_day_to_show.set()
 
 # функция для получения расписания на конкретный день
 async def get_schedule_for_day(week_day_date: str, user_id: int):
     async with aiosqlite.connect('schedule.db') as db:
-        cursor = await db.execute('SELECT * FROM schedule WHERE week_day = ? AND user_id = ?', (week_day_date, user_id))
+        cursor = await db.execute(
+            f'SELECT s.*, {RULE_COLUMNS} FROM schedule s LEFT JOIN lesson_rules r ON r.lesson_id = s.id WHERE s.week_day = ? AND s.user_id = ?',
+            (week_day_date, user_id)
+        )
         return await cursor.fetchall()
 
 # обработчик для отображения расписания на выбранный день
 @dp.message_handler(state=Schedule.week_day_to_show)
 async def show_day_schedule(message: types.Message, state: FSMContext):
-    valid_days = get_valid_week_days()
+    week_day_date = to_week_day(message.text)
     user_id = message.from_user.id
-    if message.text.lower() == 'назад':
+    if message.text.lower() == _('Назад').lower():
         await state.finish()
-        await message.answer("Выберите действие:", reply_markup=main_menu_kb)
-    elif not is_valid_week_day(message.text, valid_days):
+        await message.answer(_("Выберите действие:"), reply_markup=main_menu_kb)
+    elif week_day_date is None:
         await handle_invalid_week_day_input(message)
     else:
-        week_day_date = message.text
         schedule = await get_schedule_for_day(week_day_date, user_id)
+        # оставляем только занятия, которые проводятся на текущей неделе
+        day = current_week_date(week_day_date)
+        schedule = [entry for entry in schedule if lesson_happens_on(entry[7:], day)]
         if not schedule:
-            await message.answer(f"Расписание на {week_day_date} пусто.")
+            await message.answer(_("Расписание на {week_day} пусто.").format(week_day=week_day_title(week_day_date)))
         else:
-            schedule_message = f"Расписание на {week_day_date}:\n" + "\n".join(
-                f"{entry[3]} - {entry[4]}, {entry[5]}, ауд. {entry[6]}"
+            schedule_message = _("Расписание на {week_day}:").format(week_day=week_day_title(week_day_date)) + "\n" + "\n".join(
+                lesson_line(*entry[3:7])
                 for entry in schedule
             )
             await message.answer(schedule_message)
-        await message.answer("Хотите посмотреть расписание на другой день или вернуться в главное меню?", reply_markup=get_week_days_kb())
+        await message.answer(_("Хотите посмотреть расписание на другой день или вернуться в главное меню?"), reply_markup=get_week_days_kb())
         await Schedule.week_day_to_show.set()
 
 # обработчик команды /delete для начала процесса удаления расписания
 @dp.message_handler(commands=['delete'], state='*')
 async def delete_schedule_command(message: types.Message):
     week_days_kb = get_week_days_kb()
-    await message.answer("Выберите день недели:", reply_markup=week_days_kb)
+    await message.answer(_("Выберите день недели:"), reply_markup=week_days_kb)
     await Schedule.choosing_day_for_deletion.set()
 
 # обработчик для подтверждения удаления расписания на день недели
-@dp.message_handler(lambda message: message.text == "Удалить расписание на день недели", state=Schedule.choosing_delete_option)
+@dp.message_handler(lambda message: message.text == _("Удалить расписание на день недели"), state=Schedule.choosing_delete_option)
 async def confirm_day_schedule_deletion(message: types.Message, state: FSMContext):
     confirm_kb = ReplyKeyboardMarkup(resize_keyboard=True)
-    confirm_kb.add(KeyboardButton('Да'))
-    confirm_kb.add(KeyboardButton('Нет'))
-    await message.answer("Вы уверены, что хотите удалить расписание на выбранный день?", reply_markup=confirm_kb)
+    confirm_kb.add(KeyboardButton(_('Да')))
+    confirm_kb.add(KeyboardButton(_('Нет')))
+    await message.answer(_("Вы уверены, что хотите удалить расписание на выбранный день?"), reply_markup=confirm_kb)
     await Schedule.confirming_day_deletion.set()
 
 # обработчик для удаления
 @dp.message_handler(state=Schedule.choosing_day_for_deletion)
 async def choose_day_for_deletion(message: types.Message, state: FSMContext):
-    valid_days = get_valid_week_days()
-    if message.text.lower() == 'назад':
+    selected_day = to_week_day(message.text)
+    if message.text.lower() == _('Назад').lower():
         await state.finish()
-        await message.answer("Выберите действие:", reply_markup=main_menu_kb)
-    elif not is_valid_week_day(message.text, valid_days):
+        await message.answer(_("Выберите действие:"), reply_markup=main_menu_kb)
+    elif selected_day is None:
         await handle_invalid_week_day_input(message)
     else:
         async with state.proxy() as data:
-            data['selected_day'] = message.text
+            data['selected_day'] = selected_day
 
         delete_options_kb = ReplyKeyboardMarkup(resize_keyboard=True)
-        delete_options_kb.add(KeyboardButton('Назад'))
-        delete_options_kb.add(KeyboardButton('Удалить занятие'))
-        delete_options_kb.add(KeyboardButton('Удалить расписание на день недели'))
+        delete_options_kb.add(KeyboardButton(_('Назад')))
+        delete_options_kb.add(KeyboardButton(_('Удалить занятие')))
+        delete_options_kb.add(KeyboardButton(_('Удалить расписание на день недели')))
 
-        await message.answer("Выберите опцию удаления:", reply_markup=delete_options_kb)
+        await message.answer(_("Выберите опцию удаления:"), reply_markup=delete_options_kb)
         await Schedule.choosing_delete_option.set()
 
 # обработчик для команды удаления конкретного занятия
-@dp.message_handler(lambda message: message.text == "Удалить занятие", state=Schedule.choosing_delete_option)
+@dp.message_handler(lambda message: message.text == _("Удалить занятие"), state=Schedule.choosing_delete_option)
 async def delete_specific_lesson_command(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
     async with state.proxy() as data:
@@ -391,26 +564,25 @@ async def delete_specific_lesson_command(message: types.Message, state: FSMConte
     # получаем список занятий
     lessons = await get_lessons_for_user_by_day(user_id, selected_day)
     lessons_kb = ReplyKeyboardMarkup(resize_keyboard=True)
-    lessons_kb.add(KeyboardButton('Назад'))
+    lessons_kb.add(KeyboardButton(_('Назад')))
     for lesson in lessons:
-        button_text = f"{lesson[2]} - {lesson[3]} ({lesson[1]})"
-        lessons_kb.add(KeyboardButton(button_text))
-    await message.answer("Выберите занятие для удаления:", reply_markup=lessons_kb)
+        lessons_kb.add(KeyboardButton(lesson_button_text(lesson)))
+    await message.answer(_("Выберите занятие для удаления:"), reply_markup=lessons_kb)
     await Schedule.deleting_specific_lesson.set()
 
 # обработчик подтверждения удаления расписания на выбранный день
 @dp.message_handler(state=Schedule.confirming_day_deletion)
 async def delete_day_schedule(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    if message.text == 'Да':
+    if message.text == _('Да'):
         async with state.proxy() as data:
             selected_day = data['selected_day']
         await delete_schedule_for_day(selected_day, user_id)
-        await message.answer(f"Расписание на {selected_day} было удалено.")
+        await message.answer(_("Расписание на {week_day} было удалено.").format(week_day=week_day_title(selected_day)))
     else:
-        await message.answer("Удаление отменено.")
+        await message.answer(_("Удаление отменено."))
     await state.finish()
-    await message.answer("Выберите действие:", reply_markup=main_menu_kb)
+    await message.answer(_("Выберите действие:"), reply_markup=main_menu_kb)
 
 # функция для получения информации занятия по ID
 async def get_lesson_details_by_id(lesson_id: int):
@@ -435,37 +607,35 @@ async def get_lesson_id_by_details(user_id: int, lesson_time: str, lesson_name:
 @dp.message_handler(state=Schedule.deleting_specific_lesson)
 async def delete_chosen_lesson(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    if message.text == 'Назад':
+    if message.text == _('Назад'):
         await delete_schedule_command(message)
     else:
         # разбор сообщения пользователя для получения деталей занятия
         try:
-            lesson_details = message.text.split(' - ')
-            lesson_time = lesson_details[0].strip()
-            lesson_name, week_day = lesson_details[1].split('(')
-            lesson_name = lesson_name.strip()
-            week_day = week_day.split(')')[0].strip()
+            lesson_time, lesson_name, week_day = parse_lesson_button(message.text)
 
             # получение ID занятия
             lesson_id = await get_lesson_id_by_details(user_id, lesson_time, lesson_name, week_day)
             if lesson_id is None:
                 raise ValueError
         except (ValueError, IndexError):
-            await message.answer("Некорректный выбор. Пожалуйста, попробуйте еще раз.")
+            await message.answer(_("Некорректный выбор. Пожалуйста, попробуйте еще раз."))
             return
 
         # выполнение запроса на удаление занятия по ID
         async with aiosqlite.connect('schedule.db') as db:
+            await db.execute('DELETE FROM lesson_rules WHERE lesson_id = ?', (lesson_id,))
             await db.execute(
                 'DELETE FROM schedule WHERE id = ? AND user_id = ?',
                 (lesson_id, user_id)
             )
             await db.commit()
+        reminder_scheduler.cancel(lesson_id)
 
-        await message.answer(f"Занятие удалено.")
+        await message.answer(_("Занятие удалено."))
         
         await state.finish()
-        await message.answer("Выберите действие:", reply_markup=main_menu_kb)
+        await message.answer(_("Выберите действие:"), reply_markup=main_menu_kb)
 
 # функция для получения списка занятий пользователя по дню
 async def get_lessons_for_user_by_day(user_id: int, selected_day: str):
@@ -480,52 +650,173 @@ async def get_lessons_for_user_by_day(user_id: int, selected_day: str):
 # функция для удаления расписания на выбранный день
 async def delete_schedule_for_day(selected_day: str, user_id: int):
     async with aiosqlite.connect('schedule.db') as db:
+        cursor = await db.execute('SELECT id FROM schedule WHERE week_day = ? AND user_id = ?', (selected_day, user_id))
+        lesson_ids = [row[0] for row in await cursor.fetchall()]
+        await db.executemany('DELETE FROM lesson_rules WHERE lesson_id = ?', ((lesson_id,) for lesson_id in lesson_ids))
         await db.execute('DELETE FROM schedule WHERE week_day = ? AND user_id = ?', (selected_day, user_id))
         await db.commit()
+    for lesson_id in lesson_ids:
+        reminder_scheduler.cancel(lesson_id)
 
 # обработчик для выбора дня недели при удалении расписания
 @dp.message_handler(state=Schedule.date_to_delete)
 async def delete_schedule_for_day_handler(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
-    if message.text.lower() == 'назад':
+    if message.text.lower() == _('Назад').lower():
         await state.finish()
-        await message.answer("Выберите действие:", reply_markup=main_menu_kb)
+        await message.answer(_("Выберите действие:"), reply_markup=main_menu_kb)
     else:
-        selected_date_str = message.text.strip()
+        selected_day = to_week_day(message.text)
         try:
-            await delete_schedule_for_day(selected_date_str, user_id)
-            await message.answer(f"Расписание на {selected_date_str} было удалено.")
+            if selected_day is None:
+                raise ValueError(message.text)
+            await delete_schedule_for_day(selected_day, user_id)
+            await message.answer(_("Расписание на {week_day} было удалено.").format(week_day=week_day_title(selected_day)))
         except Exception as e:
-            await message.answer(f"Произошла ошибка при удалении расписания: {e}")
-        await message.answer("Хотите удалить расписание на другой день или вернуться в главное меню?", reply_markup=get_week_days_kb())
+            await message.answer(_("Произошла ошибка при удалении расписания: {error}").format(error=e))
+        await message.answer(_("Хотите удалить расписание на другой день или вернуться в главное меню?"), reply_markup=get_week_days_kb())
         await Schedule.date_to_delete.set()
 
+# функция для получения подсказки по формату правила повторения занятия
+def rules_help():
+    return _(
+        "Введите правило в формате: неделя; период; даты отмены.\n"
+        "Неделя: все, чёт или нечёт (недели считаются от начала семестра {semester_start}).\n"
+        "Период: ДД.ММ.ГГГГ-ДД.ММ.ГГГГ или '-'.\n"
+        "Даты отмены: через запятую или '-'.\n"
+        "Пример: нечёт; 01.09.2026-25.12.2026; 04.11.2026, 30.12.2026"
+    ).format(semester_start=SEMESTER_START.strftime('%d.%m.%Y'))
+
+# функция для пересборки битовых карт, построенных для другого семестра
+async def rebuild_lesson_bitmaps(db):
+    cursor = await db.execute(
+        'SELECT r.lesson_id, s.week_day, r.week_parity, r.start_date, r.end_date, r.exceptions '
+        'FROM lesson_rules r JOIN schedule s ON s.id = r.lesson_id WHERE r.semester_start != ?',
+        (SEMESTER_START.isoformat(),)
+    )
+    for lesson_id, week_day, *rule_row in await cursor.fetchall():
+        if week_day not in WEEK_DAYS:
+            logging.warning(f"Правило занятия {lesson_id} пропущено: неизвестный день недели {week_day!r}")
+            continue
+        bitmap = build_bitmap(load_rule(*rule_row), week_day_index(week_day), SEMESTER_START, SEMESTER_WEEKS)
+        await db.execute(
+            'UPDATE lesson_rules SET semester_start = ?, bitmap = ? WHERE lesson_id = ?',
+            (SEMESTER_START.isoformat(), bitmap, lesson_id)
+        )
+
+# функция для получения правила повторения занятия
+async def get_lesson_rule(lesson_id: int):
+    async with aiosqlite.connect('schedule.db') as db:
+        cursor = await db.execute(
+            'SELECT week_parity, start_date, end_date, exceptions FROM lesson_rules WHERE lesson_id = ?',
+            (lesson_id,)
+        )
+        row = await cursor.fetchone()
+    return load_rule(*row) if row else WEEKLY
+
+# функция для сохранения правила повторения занятия вместе с его битовой картой
+async def save_lesson_rule(lesson_id: int, week_day: str, rule):
+    async with aiosqlite.connect('schedule.db') as db:
+        if rule == WEEKLY:
+            await db.execute('DELETE FROM lesson_rules WHERE lesson_id = ?', (lesson_id,))
+        else:
+            bitmap = build_bitmap(rule, week_day_index(week_day), SEMESTER_START, SEMESTER_WEEKS)
+            await db.execute(
+                'INSERT OR REPLACE INTO lesson_rules (lesson_id, week_parity, start_date, end_date, exceptions, semester_start, bitmap) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (lesson_id, *dump_rule(rule), SEMESTER_START.isoformat(), bitmap)
+            )
+        await db.commit()
+    await refresh_lesson_reminder(lesson_id)
+
+# обработчик команды /rules для настройки чередования недель и отмен занятия
+@dp.message_handler(commands=['rules'], state='*')
+async def rules_command(message: types.Message):
+    await message.answer(_("Выберите день недели занятия:"), reply_markup=get_week_days_kb())
+    await Schedule.choosing_day_for_rules.set()
+
+# обработчик для выбора дня недели при настройке правил
+@dp.message_handler(state=Schedule.choosing_day_for_rules)
+async def choose_day_for_rules(message: types.Message, state: FSMContext):
+    selected_day = to_week_day(message.text)
+    user_id = message.from_user.id
+    if message.text.lower() == _('Назад').lower():
+        await state.finish()
+        await message.answer(_("Выберите действие:"), reply_markup=main_menu_kb)
+    elif selected_day is None:
+        await handle_invalid_week_day_input(message)
+    else:
+        lessons = await get_lessons_for_user_by_day(user_id, selected_day)
+        lessons_kb = ReplyKeyboardMarkup(resize_keyboard=True)
+        lessons_kb.add(KeyboardButton(_('Назад')))
+        for lesson in lessons:
+            lessons_kb.add(KeyboardButton(lesson_button_text(lesson)))
+        await message.answer(_("Выберите занятие:"), reply_markup=lessons_kb)
+        await Schedule.choosing_lesson_for_rules.set()
+
+# обработчик для выбора занятия при настройке правил
+@dp.message_handler(state=Schedule.choosing_lesson_for_rules)
+async def choose_lesson_for_rules(message: types.Message, state: FSMContext):
+    user_id = message.from_user.id
+    if message.text == _('Назад'):
+        await rules_command(message)
+    else:
+        try:
+            lesson_time, lesson_name, week_day = parse_lesson_button(message.text)
+
+            lesson_id = await get_lesson_id_by_details(user_id, lesson_time, lesson_name, week_day)
+            if lesson_id is None:
+                raise ValueError
+        except (ValueError, IndexError):
+            await message.answer(_("Некорректный выбор. Пожалуйста, попробуйте еще раз."))
+            return
+
+        async with state.proxy() as data:
+            data['lesson_id'] = lesson_id
+            data['week_day'] = week_day
+        rule = await get_lesson_rule(lesson_id)
+        await message.answer(_("Текущее правило: {rule}").format(rule=format_rule(rule)) + "\n\n" + rules_help(), reply_markup=get_back_kb())
+        await Schedule.entering_lesson_rules.set()
+
+# обработчик для ввода правила повторения занятия
+@dp.message_handler(state=Schedule.entering_lesson_rules)
+async def lesson_rules_entered(message: types.Message, state: FSMContext):
+    if message.text.lower() == _('Назад').lower():
+        await state.finish()
+        await message.answer(_("Выберите действие:"), reply_markup=main_menu_kb)
+        return
+    try:
+        rule = parse_rule(message.text)
+    except ValueError as e:
+        await message.answer(f"{e}\n\n{rules_help()}", reply_markup=get_back_kb())
+        return
+
+    async with state.proxy() as data:
+        lesson_id = data['lesson_id']
+        week_day = data['week_day']
+    await save_lesson_rule(lesson_id, week_day, rule)
+    await state.finish()
+    await message.answer(_("Правило сохранено: {rule}").format(rule=format_rule(rule)), reply_markup=main_menu_kb)
+
 # обработчик команды /showdb для отображения всей информации из базы данных
 @dp.message_handler(commands=['showdb'], state='*')
 async def show_db(message: types.Message):
     user_id = message.from_user.id
     if user_id == ADMIN_ID:
-        response = "Содержимое базы данных:\n\n"
         async with aiosqlite.connect('schedule.db') as db:
             cursor = await db.execute('SELECT id, user_id, week_day, lesson_time, lesson_name, teacher_name, classroom FROM schedule')
             rows = await cursor.fetchall()
 
         if not rows:
-            await message.answer("База данных расписания пуста.")
+            await message.answer(_("База данных расписания пуста."))
         else:
+            reply = ReplyBuilder(message_limit=MAX_MESSAGE_LENGTH, document_name='schedule_db.txt')
+            reply.add_block(_("Содержимое базы данных:") + "\n\n")
+            row_format = _("ID: {0}, USER_ID: {1}, День: {2}, Время: {3}, Занятие: {4}, Преподаватель: {5}, Аудитория: {6}")
             for row in rows:
-                row_text = f"ID: {row[0]}, USER_ID: {row[1]}, День: {row[2]}, Время: {row[3]}, Занятие: {row[4]}, Преподаватель: {row[5]}, Аудитория: {row[6]}\n"
-                if len(response) + len(row_text) < MAX_MESSAGE_LENGTH:
-                    response += row_text
-                else:
-                    await message.answer(response)
-                    response = row_text
-
-            # отправить оставшиеся данные после цикла
-            if response:
-                await message.answer(response)
+                reply.add_block(row_format.format(*row) + "\n")
+            await reply.answer(message)
     else:
-        await message.answer("У вас нет прав для использования этой команды.")
+        await message.answer(_("У вас нет прав для использования этой команды."))
 
 
 # обработчик команды /showsubs для отображения всех подписок
@@ -537,48 +828,195 @@ async def show_subscriptions(message: types.Message):
             cursor = await db.execute('SELECT * FROM subscriptions')
             rows = await cursor.fetchall()
             if not rows:
-                await message.answer("В базе данных нет подписок.")
+                await message.answer(_("В базе данных нет подписок."))
                 return
             # формирование ответного сообщения с данными о подписках
-            response = "Список всех подписок:\n\n"
+            reply = ReplyBuilder(message_limit=MAX_MESSAGE_LENGTH, document_name='subscriptions.txt')
+            reply.add_block(_("Список всех подписок:") + "\n\n")
+            row_format = _("USER_ID: {0}, Активность: {1}, Время: {2}, Часовой пояс: {3}")
             for row in rows:
-                response += f"USER_ID: {row[0]}, Активность: {row[1]}, Время: {row[2]}, Часовой пояс: {row[3]}\n"
-            await message.answer(response)
+                reply.add_block(row_format.format(*row) + "\n")
+            await reply.answer(message)
     else:
-        await message.answer("У вас нет прав для использования этой команды.")  
+        await message.answer(_("У вас нет прав для использования этой команды."))  
+
+profiler = StackSampler()
+
+# функция для завершения профилирования через заданное время и отправки результата администратору
+# (сэмплер запускается в обработчике команды, до первого await)
+async def run_profiling(chat_id: int, seconds: int):
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    if not profiler.samples:
+        await bot.send_message(chat_id, _("Профилирование завершено, но сэмплы не собраны."))
+        return
+    filename = f"profile-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.collapsed"
+    document = types.InputFile(io.BytesIO(profiler.collapsed().encode('utf-8')), filename=filename)
+    await bot.send_document(
+        chat_id, document,
+        caption=_("Профиль за {seconds} с, сэмплов: {samples}. Формат collapsed stacks (flamegraph.pl, speedscope).").format(seconds=seconds, samples=profiler.samples)
+    )
+
+# обработчик команды /profile для сэмплирующего профилирования бота
+@dp.message_handler(commands=['profile'], state='*')
+async def profile_command(message: types.Message):
+    user_id = message.from_user.id
+    if user_id == ADMIN_ID:
+        if profiler.running:
+            await message.answer(_("Профилирование уже запущено, дождитесь результата."))
+            return
+        args = message.get_args()
+        try:
+            seconds = int(args) if args else PROFILE_DEFAULT_SECONDS
+        except ValueError:
+            await message.answer(_("Укажите длительность в секундах, например: /profile 30"))
+            return
+        seconds = max(1, min(seconds, PROFILE_MAX_SECONDS))
+        # сэмплер запускается до первого await, иначе две команды подряд обе пройдут проверку profiler.running
+        profiler.start()
+        asyncio.create_task(run_profiling(message.chat.id, seconds))
+        await message.answer(_("Профилирование запущено на {seconds} с.").format(seconds=seconds))
+    else:
+        await message.answer(_("У вас нет прав для использования этой команды."))
 
 class Confirm(StatesGroup):
-    confirmation = State()
+    reset_db = State()
+    reset_subs = State()
+    restore = State()
+
+# функция для онлайн-копирования одной базы SQLite в другую через backup API.
+# Копирование идёт порциями по BACKUP_PAGES_PER_STEP страниц в потоке aiosqlite,
+# поэтому цикл событий не блокируется, а между шагами бот может писать в базу.
+async def copy_database(source_path: str, target_path: str):
+    async with aiosqlite.connect(source_path) as source, aiosqlite.connect(target_path) as target:
+        await source.backup(target, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP)
+
+# функция для создания снимка базы данных, возвращает имя файла снимка;
+# снимки из protect не удаляются при очистке старых снимков с той же меткой
+async def create_snapshot(label: str = 'manual', protect=()):
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S-%f')
+    name = f"schedule-{stamp}-{label}.db"
+    counter = 1
+    while os.path.exists(os.path.join(BACKUP_DIR, name)):
+        name = f"schedule-{stamp}-{counter}-{label}.db"
+        counter += 1
+    await copy_database('schedule.db', os.path.join(BACKUP_DIR, name))
+    prune_snapshots(label, protect=(name, *protect))
+    return name
+
+# функция для получения списка снимков, от новых к старым
+def list_snapshots():
+    if not os.path.isdir(BACKUP_DIR):
+        return []
+    return sorted((name for name in os.listdir(BACKUP_DIR) if name.endswith('.db')), reverse=True)
+
+# функция для удаления старых снимков: для метки остаются только BACKUP_KEEP_PER_LABEL последних
+def prune_snapshots(label: str, protect=()):
+    snapshots = [name for name in list_snapshots() if name.endswith(f'-{label}.db')]
+    for name in snapshots[BACKUP_KEEP_PER_LABEL:]:
+        if name in protect:
+            continue
+        try:
+            os.remove(os.path.join(BACKUP_DIR, name))
+        except OSError as e:
+            logging.warning(f"Не удалось удалить старый снимок {name}: {e}")
+
+# функция для пересоздания группы таблиц в одной транзакции; tables — список кортежей
+# (таблица, запросы создания...). Связанные таблицы (например, schedule и lesson_rules)
+# пересоздаются вместе, иначе после сбоя старые правила достались бы новым занятиям с теми же id
+async def recreate_tables(tables):
+    async with aiosqlite.connect('schedule.db') as db:
+        await db.execute('BEGIN IMMEDIATE')
+        try:
+            for table, *create_sql in tables:
+                await db.execute(f'DROP TABLE IF EXISTS {table}')
+                for sql in create_sql:
+                    await db.execute(sql)
+        except Exception:
+            await db.rollback()
+            raise
+        await db.commit()
+
+# обработчик команды /snapshot для создания снимка базы данных
+@dp.message_handler(commands=['snapshot'], state='*')
+async def snapshot_command(message: types.Message):
+    user_id = message.from_user.id
+    if user_id == ADMIN_ID:
+        name = await create_snapshot()
+        await message.answer(_("Снимок базы данных создан: {name}").format(name=name))
+    else:
+        await message.answer(_("У вас нет прав для использования этой команды."))
+
+# обработчик команды /restore для восстановления базы данных из снимка
+@dp.message_handler(commands=['restore'], state='*')
+async def restore_command(message: types.Message, state: FSMContext):
+    user_id = message.from_user.id
+    if user_id == ADMIN_ID:
+        snapshots = list_snapshots()
+        name = message.get_args().strip()
+        if not snapshots:
+            await message.answer(_("Снимков базы данных нет."))
+        elif not name:
+            await message.answer(_("Доступные снимки:") + "\n" + "\n".join(snapshots) + "\n\n" + _("Используйте: /restore <имя снимка>"))
+        elif name not in snapshots:
+            await message.answer(_("Снимок не найден."))
+        else:
+            async with state.proxy() as data:
+                data['snapshot'] = name
+            await message.answer(_("Восстановить базу данных из снимка {name}? Текущее состояние будет сохранено в отдельный снимок. Введите 'да' для подтверждения.").format(name=name))
+            await Confirm.restore.set()
+    else:
+        await message.answer(_("У вас нет прав для использования этой команды."))
+
+# обработчик подтверждения восстановления базы данных
+@dp.message_handler(state=Confirm.restore)
+async def confirm_restore(message: types.Message, state: FSMContext):
+    if message.text.lower() == _('Да').lower():
+        async with state.proxy() as data:
+            name = data['snapshot']
+        if name not in list_snapshots():
+            await message.answer(_("Снимок не найден."))
+            await state.finish()
+            return
+        backup_name = await create_snapshot('before-restore', protect=(name,))
+        await copy_database(os.path.join(BACKUP_DIR, name), 'schedule.db')
+        # снимок мог быть сделан до появления части таблиц и столбцов, приводим схему к текущей
+        await init_db()
+        reminder_scheduler.clear()
+        await load_reminders()
+        await message.answer(_("База данных восстановлена из снимка {name}. Предыдущее состояние сохранено в {backup_name}.").format(name=name, backup_name=backup_name))
+    else:
+        await message.answer(_("Восстановление базы данных отменено."))
+    await state.finish()
 
 # обработчик команды /resetdb для сброса базы данных
 @dp.message_handler(commands=['resetdb'], state='*')
 async def reset_db_command(message: types.Message):
     user_id = message.from_user.id
     if user_id == ADMIN_ID:
-        await message.answer("Вы уверены, что хотите удалить и заново создать базу данных? Это действие необратимо. Введите 'да' для подтверждения.")
-        await Confirm.confirmation.set()
+        await message.answer(_("Вы уверены, что хотите удалить и заново создать базу данных? Перед сбросом будет создан снимок. Введите 'да' для подтверждения."))
+        await Confirm.reset_db.set()
     else:
-        await message.answer("У вас нет прав для использования этой команды.")
+        await message.answer(_("У вас нет прав для использования этой команды."))
 
 # обработчик подтверждения сброса базы данных
-@dp.message_handler(state=Confirm.confirmation)
+@dp.message_handler(state=Confirm.reset_db)
 async def confirm_reset_db(message: types.Message, state: FSMContext):
-    if message.text.lower() == 'да':
-        async with aiosqlite.connect('schedule.db') as db:
-            await db.execute('DROP TABLE IF EXISTS schedule')
-            await db.execute('''CREATE TABLE IF NOT EXISTS schedule (
-                                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                                user_id INTEGER NOT NULL,
-                                week_day TEXT NOT NULL,
-                                lesson_time TEXT NOT NULL,
-                                lesson_name TEXT NOT NULL,
-                                teacher_name TEXT NOT NULL,
-                                classroom TEXT NOT NULL,
-                                FOREIGN KEY(user_id) REFERENCES subscriptions(user_id))''')
-            await db.commit()
-        await message.answer("База данных была успешно сброшена и заново создана.")
+    if message.text.lower() == _('Да').lower():
+        name = await create_snapshot('before-resetdb')
+        await recreate_tables([
+            ('schedule', SCHEDULE_TABLE_SQL, SCHEDULE_INDEX_SQL),
+            ('lesson_rules', LESSON_RULES_TABLE_SQL),
+            ('schedule_archive', SCHEDULE_ARCHIVE_TABLE_SQL, SCHEDULE_ARCHIVE_INDEX_SQL),
+            ('lesson_rules_archive', LESSON_RULES_ARCHIVE_TABLE_SQL),
+        ])
+        reminder_scheduler.clear()
+        await message.answer(_("База данных была успешно сброшена и заново создана. Снимок перед сбросом: {name}").format(name=name))
     else:
-        await message.answer("Сброс базы данных отменен.")
+        await message.answer(_("Сброс базы данных отменен."))
     await state.finish()
 
 # обработчик команды /resetsubs для сброса таблицы подписок
@@ -586,27 +1024,24 @@ async def confirm_reset_db(message: types.Message, state: FSMContext):
 async def reset_subs_command(message: types.Message):
     user_id = message.from_user.id
     if user_id == ADMIN_ID:
-        await message.answer("Вы уверены, что хотите удалить и заново создать таблицу подписок? Это действие необратимо. Введите 'да' для подтверждения.")
-        await Confirm.confirmation.set()
+        await message.answer(_("Вы уверены, что хотите удалить и заново создать таблицу подписок? Перед сбросом будет создан снимок. Введите 'да' для подтверждения."))
+        await Confirm.reset_subs.set()
     else:
-        await message.answer("У вас нет прав для использования этой команды.")
+        await message.answer(_("У вас нет прав для использования этой команды."))
 
 # обработчик подтверждения сброса таблицы подписок
-@dp.message_handler(state=Confirm.confirmation)
+@dp.message_handler(state=Confirm.reset_subs)
 async def confirm_reset_subs(message: types.Message, state: FSMContext):
-    if message.text.lower() == 'да':
-        async with aiosqlite.connect('schedule.db') as db:
-            await db.execute('DROP TABLE IF EXISTS subscriptions')
-            await db.execute('''CREATE TABLE IF NOT EXISTS subscriptions (
-                                user_id INTEGER PRIMARY KEY,
-                                active BOOLEAN NOT NULL CHECK (active IN (0, 1)),
-                                notification_time TEXT,
-                                timezone TEXT
-                            )''')
-            await db.commit()
-        await message.answer("Таблица подписок была успешно сброшена и заново создана.")
+    if message.text.lower() == _('Да').lower():
+        name = await create_snapshot('before-resetsubs')
+        await recreate_tables([
+            ('subscriptions', SUBSCRIPTIONS_TABLE_SQL),
+            ('subscriptions_archive', SUBSCRIPTIONS_ARCHIVE_TABLE_SQL),
+        ])
+        reminder_scheduler.clear()
+        await message.answer(_("Таблица подписок была успешно сброшена и заново создана. Снимок перед сбросом: {name}").format(name=name))
     else:
-        await message.answer("Сброс таблицы подписок отменен.")
+        await message.answer(_("Сброс таблицы подписок отменен."))
     await state.finish()
 
 # обработчик команды /view для просмотра БД
@@ -614,14 +1049,16 @@ async def confirm_reset_subs(message: types.Message, state: FSMContext):
 async def view_schedule(message: types.Message):
     user_id = message.from_user.id
     
-    schedule_query = '''
+    schedule_query = f'''
     SELECT week_day, 
            printf("%02d:%s", CAST(substr(lesson_time, 1, instr(lesson_time, ':') - 1) AS INTEGER),
            substr(lesson_time, instr(lesson_time, ':') + 1)) AS formatted_lesson_time,
            lesson_name, 
            teacher_name, 
-           classroom
+           classroom,
+           {RULE_COLUMNS}
     FROM schedule
+    LEFT JOIN lesson_rules r ON r.lesson_id = schedule.id
     WHERE user_id = ?
     ORDER BY 
         CASE week_day
@@ -641,28 +1078,29 @@ async def view_schedule(message: types.Message):
         rows = await cursor.fetchall()
     
     # Заполнение словаря
-    days_of_week = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+    days_of_week = WEEK_DAYS[:SCHOOL_DAYS]
     for day in days_of_week:
         schedule_by_day[day] = []
 
-    for week_day, formatted_lesson_time, lesson_name, teacher_name, classroom in rows:
-        schedule_by_day[week_day].append(f"{formatted_lesson_time} - {lesson_name}, {teacher_name}, ауд. {classroom}")
+    # показываем только занятия, которые проводятся на текущей неделе
+    today = datetime.now().date()
+    monday = today - timedelta(days=today.weekday())
+    for week_day, formatted_lesson_time, lesson_name, teacher_name, classroom, *rule_row in rows:
+        if week_day not in schedule_by_day:
+            continue  # день недели, который не удалось перевести в WEEK_DAYS при запуске
+        if not lesson_happens_on(rule_row, monday + timedelta(days=days_of_week.index(week_day))):
+            continue
+        schedule_by_day[week_day].append(lesson_line(formatted_lesson_time, lesson_name, teacher_name, classroom))
     
-    response = "Ваше расписание:\n"
-    # формирование и отправка сообщений
+    # формирование и отправка сообщений, расписание каждого дня — отдельный блок
+    reply = ReplyBuilder(message_limit=MAX_MESSAGE_LENGTH, document_name='schedule.txt')
+    reply.add_block(_("Ваше расписание:") + "\n")
     for day in days_of_week:
         if schedule_by_day[day]:
-            response += f"{day}:\n" + "\n".join(schedule_by_day[day]) + "\n\n"
+            reply.add_block(f"{week_day_title(day)}:\n" + "\n".join(schedule_by_day[day]) + "\n\n")
         else:
-            response += f"{day}:\nНет расписания.\n\n"
-
-        if len(response) > 4000:
-            await message.answer(response)
-            response = ""
-    
-    # проверяем, остался ли текст для отправки
-    if response:
-        await message.answer(response)
+            reply.add_block(f"{week_day_title(day)}:\n" + _("Нет расписания.") + "\n\n")
+    await reply.answer(message)
 
 
 # класс состояний для уведомлений
@@ -688,17 +1126,19 @@ def detect_sentiment(message):
 
 # функция для проверки ввода дня недели
 async def handle_invalid_week_day_input(message: types.Message):
-    default_reply = "Пожалуйста, выберите корректный день недели."
+    default_reply = _("Пожалуйста, выберите корректный день недели.")
+    reply = default_reply
     try:
-        sentiment = detect_sentiment(message.text)
-        if sentiment == "NEGATIVE":
-            reply = random.choice(negative_replies) + " " + default_reply
-        elif sentiment == "POSITIVE":
-            reply = random.choice(positive_replies) + " " + default_reply
-        elif sentiment == "MIXED":
-            reply = random.choice(mixed_replies) + " " + default_reply
-        else:
-            reply = default_reply
+        # сверх лимита не обращаемся к AWS, а отвечаем стандартным текстом
+        if throttling_buckets.consume((message.from_user.id, 'sentiment'), SENTIMENT_LIMIT):
+            # вызовы boto3 синхронные, поэтому выполняем их вне цикла событий
+            sentiment = await asyncio.get_running_loop().run_in_executor(None, detect_sentiment, message.text)
+            if sentiment == "NEGATIVE":
+                reply = str(random.choice(negative_replies)) + " " + default_reply
+            elif sentiment == "POSITIVE":
+                reply = str(random.choice(positive_replies)) + " " + default_reply
+            elif sentiment == "MIXED":
+                reply = str(random.choice(mixed_replies)) + " " + default_reply
     except Exception:
         reply = default_reply
     finally:
@@ -709,10 +1149,10 @@ async def handle_invalid_week_day_input(message: types.Message):
 @dp.message_handler(commands=['notification'], state='*')
 async def notification_command(message: types.Message):
     await message.answer(
-        "Это автоматическая рассылка расписания.\n"
-        "Вы можете подписаться на ежедневные уведомления с расписанием.\n"
-        "Чтобы подписаться, ответьте 'да',\nчтобы отписаться — 'нет'.",
-        reply_markup=types.ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True).add('Да', 'Нет', 'Назад')
+        _("Это автоматическая рассылка расписания.\n"
+          "Вы можете подписаться на ежедневные уведомления с расписанием.\n"
+          "Чтобы подписаться, ответьте 'да',\nчтобы отписаться — 'нет'."),
+        reply_markup=types.ReplyKeyboardMarkup(resize_keyboard=True, one_time_keyboard=True).add(_('Да'), _('Нет'), _('Назад'))
     )
     await Notification.waiting_for_confirmation.set()
 
@@ -721,20 +1161,21 @@ async def notification_command(message: types.Message):
 async def notification_confirmation(message: types.Message, state: FSMContext):
     user_id = message.from_user.id
     
-    if message.text.lower() == 'назад':
+    if message.text.lower() == _('Назад').lower():
         await state.finish()
-        await message.answer("Выберите действие:", reply_markup=main_menu_kb)
-    elif message.text.lower() == 'да':
-        await message.answer("Введите время для уведомлений в формате ЧЧ:ММ (например, 18:00):")
+        await message.answer(_("Выберите действие:"), reply_markup=main_menu_kb)
+    elif message.text.lower() == _('Да').lower():
+        await message.answer(_("Введите время для уведомлений в формате ЧЧ:ММ (например, 18:00):"))
         await Notification.waiting_for_time.set()
-    elif message.text.lower() == 'нет':
+    elif message.text.lower() == _('Нет').lower():
         async with aiosqlite.connect('schedule.db') as db:
             await db.execute('''UPDATE subscriptions SET active = 0 WHERE user_id = ?''', (user_id,))
             await db.commit()
-        await message.answer("Вы отменили подписку на уведомления.", reply_markup=main_menu_kb)
+        await refresh_user_reminders(user_id)
+        await message.answer(_("Вы отменили подписку на уведомления."), reply_markup=main_menu_kb)
         await state.finish()
     else:
-        await message.answer("Пожалуйста, ответьте 'да' или 'нет'.")
+        await message.answer(_("Пожалуйста, ответьте 'да' или 'нет'."))
 
 # обработчик для установки времени уведомлений
 @dp.message_handler(state=Notification.waiting_for_time)
@@ -746,10 +1187,10 @@ async def set_notification_time(message: types.Message, state: FSMContext):
         async with state.proxy() as data:
             data['notification_time'] = notification_time
         # запрос выбора часового пояса
-        await message.answer("Введите ваш часовой пояс в формате UTC+-N (Нужно ввести число N, например 7, 0 или -3):")
+        await message.answer(_("Введите ваш часовой пояс в формате UTC+-N (Нужно ввести число N, например 7, 0 или -3):"))
         await Notification.waiting_for_timezone.set()
     except ValueError:
-        await message.answer("Неверный формат времени. Пожалуйста, используйте формат ЧЧ:ММ.")
+        await message.answer(_("Неверный формат времени. Пожалуйста, используйте формат ЧЧ:ММ."))
 
 # функция для конвертации времени пользователя в UTC
 def convert_to_utc(user_time, timezone_offset):
@@ -777,7 +1218,8 @@ async def set_timezone(message: types.Message, state: FSMContext):
                                                    timezone = excluded.timezone''',
                                 (user_id, True, notification_time_utc, user_timezone))
                 await db.commit()
-            await message.answer(f"Уведомления установлены на {notification_time} (Часовой пояc в формате UTC: {user_timezone}).", reply_markup=main_menu_kb)
+            await refresh_user_reminders(user_id)
+            await message.answer(_("Уведомления установлены на {time} (Часовой пояc в формате UTC: {timezone}).").format(time=notification_time, timezone=user_timezone), reply_markup=main_menu_kb)
             await state.finish()
     except ValueError as e:
         await message.answer(str(e))
@@ -785,38 +1227,282 @@ async def set_timezone(message: types.Message, state: FSMContext):
 # функция для проверки и отправки уведомлений
 async def check_and_send_notifications():
     utc_now = datetime.utcnow()
+    unreachable = []
 
     async with aiosqlite.connect('schedule.db') as db:
-        cursor = await db.execute('SELECT user_id, notification_time, timezone FROM subscriptions WHERE active = 1')
+        cursor = await db.execute(
+            'SELECT s.user_id, s.notification_time, s.timezone, a.locale FROM subscriptions s '
+            'LEFT JOIN user_activity a ON a.user_id = s.user_id WHERE s.active = 1'
+        )
         subscriptions = await cursor.fetchall()
 
-        for user_id, notification_time_utc, timezone_offset in subscriptions:
+        for user_id, notification_time_utc, timezone_offset, stored_locale in subscriptions:
             # проверяем, соответствует ли текущее UTC время времени уведомления в UTC
             if utc_now.strftime("%H:%M") == notification_time_utc:
                 # определяем локальное время пользователя
                 user_local_time = utc_now + timedelta(hours=int(timezone_offset))
                 # определяем завтрашний день для пользователя
-                user_tomorrow = (user_local_time + timedelta(days=1)).strftime('%A')
+                user_tomorrow_date = user_local_time + timedelta(days=1)
+                user_tomorrow = WEEK_DAYS[user_tomorrow_date.weekday()]
 
                 # получаем расписание на завтрашний день в локальном времени пользователя
-                cursor = await db.execute('SELECT lesson_time, lesson_name, teacher_name, classroom FROM schedule WHERE user_id = ? AND week_day = ?', (user_id, user_tomorrow))
-                schedule_entries = await cursor.fetchall()
+                cursor = await db.execute(
+                    f'SELECT s.lesson_time, s.lesson_name, s.teacher_name, s.classroom, {RULE_COLUMNS} FROM schedule s '
+                    'LEFT JOIN lesson_rules r ON r.lesson_id = s.id WHERE s.user_id = ? AND s.week_day = ?',
+                    (user_id, user_tomorrow)
+                )
+                schedule_entries = [entry[:4] for entry in await cursor.fetchall() if lesson_happens_on(entry[4:], user_tomorrow_date.date())]
 
                 if schedule_entries:
-                    message_text = f"Расписание на завтра ({user_tomorrow}):\n" + "\n".join(f"{time} - {name}, {teacher}, ауд. {classroom}" for time, name, teacher, classroom in schedule_entries)
+                    locale = user_locale(user_id, stored_locale)
+                    message_text = _("Расписание на завтра ({week_day}):", locale=locale).format(week_day=week_day_title(user_tomorrow, locale)) + "\n" + "\n".join(
+                        lesson_line(*entry, locale=locale) for entry in schedule_entries
+                    )
                     logging.info(f"Отправка уведомления пользователю {user_id}.")
                     try:
                         await bot.send_message(user_id, message_text)
+                    except UNREACHABLE_CHAT_ERRORS as e:
+                        logging.info(f"Чат пользователя {user_id} недоступен: {e}")
+                        unreachable.append(user_id)
                     except Exception as e:
                         logging.error(f"Не удалось отправить сообщение пользователю {user_id}: {e}")
                 else:
                     logging.info(f"Нет расписания для отправки пользователю {user_id} на {user_tomorrow}")
 
+    if unreachable:
+        await deactivate_unreachable_chats(unreachable)
+
+
+# выборка занятий подписанных пользователей вместе с часовым поясом для напоминаний
+REMINDER_QUERY = f'''SELECT s.id, s.user_id, s.week_day, s.lesson_time, s.lesson_name, s.teacher_name, s.classroom, sub.timezone, a.locale, {RULE_COLUMNS}
+                    FROM schedule s JOIN subscriptions sub ON sub.user_id = s.user_id
+                    LEFT JOIN lesson_rules r ON r.lesson_id = s.id
+                    LEFT JOIN user_activity a ON a.user_id = s.user_id
+                    WHERE sub.active = 1'''
+
+# функция для вычисления ближайшего времени напоминания о занятии (UTC timestamp)
+def next_reminder_time(week_day, lesson_time, timezone_offset, rule_row=None, now=None):
+    now = now or datetime.utcnow()
+    offset = timedelta(hours=int(timezone_offset))
+    lesson_start = datetime.strptime(lesson_time.strip(), "%H:%M")
+    user_local_time = now + offset
+    day = user_local_time + timedelta(days=(week_day_index(week_day) - user_local_time.weekday()) % 7)
+    # занятие без правила проводится каждую неделю, с правилом — ищем до конца периода правила
+    rule = WEEKLY if rule_row is None or rule_row[0] is None else load_rule(*rule_row[1:])
+    while rule.end_date is None or day.date() <= rule.end_date:
+        if rule_row is None or lesson_happens_on(rule_row, day.date()):
+            start = day.replace(hour=lesson_start.hour, minute=lesson_start.minute, second=0, microsecond=0)
+            remind_at = start - offset - timedelta(minutes=REMINDER_MINUTES)
+            if remind_at > now:
+                return remind_at.replace(tzinfo=pytz.utc).timestamp()
+        day += timedelta(days=7)
+    return None
+
+# функция для постановки напоминания о занятии в планировщик
+def schedule_lesson_reminder(row):
+    lesson_id, user_id, week_day, lesson_time, lesson_name, teacher_name, classroom, timezone_offset, stored_locale, *rule_row = row
+    try:
+        when = next_reminder_time(week_day, lesson_time, timezone_offset, rule_row)
+    except (ValueError, TypeError):
+        when = None  # некорректное время занятия или часовой пояс
+    if when is None:
+        reminder_scheduler.cancel(lesson_id)
+    else:
+        reminder_scheduler.schedule(lesson_id, when, row)
+
+# функция для загрузки всех напоминаний из базы данных при запуске
+async def load_reminders():
+    async with aiosqlite.connect('schedule.db') as db:
+        cursor = await db.execute(REMINDER_QUERY)
+        rows = await cursor.fetchall()
+    for row in rows:
+        schedule_lesson_reminder(row)
+    logging.info(f"Загружено напоминаний о занятиях: {len(reminder_scheduler)}")
+
+# функция для обновления напоминания об одном занятии после добавления или редактирования
+async def refresh_lesson_reminder(lesson_id: int):
+    async with aiosqlite.connect('schedule.db') as db:
+        cursor = await db.execute(REMINDER_QUERY + ' AND s.id = ?', (lesson_id,))
+        row = await cursor.fetchone()
+    if row:
+        schedule_lesson_reminder(row)
+    else:
+        reminder_scheduler.cancel(lesson_id)
+
+# функция для обновления напоминаний пользователя после изменения подписки
+async def refresh_user_reminders(user_id: int):
+    async with aiosqlite.connect('schedule.db') as db:
+        cursor = await db.execute('SELECT id FROM schedule WHERE user_id = ?', (user_id,))
+        lesson_ids = [row[0] for row in await cursor.fetchall()]
+        cursor = await db.execute(REMINDER_QUERY + ' AND s.user_id = ?', (user_id,))
+        rows = await cursor.fetchall()
+    for lesson_id in lesson_ids:
+        reminder_scheduler.cancel(lesson_id)
+    for row in rows:
+        schedule_lesson_reminder(row)
+
+# функция для отправки напоминания о занятии, вызывается планировщиком
+async def send_lesson_reminder(lesson_id, when, payload):
+    user_id, lesson_details, stored_locale = payload[1], payload[3:7], payload[8]
+    # сразу планируем напоминание о следующем проведении занятия
+    schedule_lesson_reminder(payload)
+    locale = user_locale(user_id, stored_locale)
+    try:
+        await bot.send_message(
+            user_id,
+            _("Через {minutes} мин. начнётся занятие:", locale=locale).format(minutes=REMINDER_MINUTES) + "\n" + lesson_line(*lesson_details, locale=locale)
+        )
+    except UNREACHABLE_CHAT_ERRORS as e:
+        logging.info(f"Чат пользователя {user_id} недоступен: {e}")
+        await deactivate_unreachable_chats([user_id])
+    except Exception as e:
+        logging.error(f"Не удалось отправить напоминание пользователю {user_id}: {e}")
+
+reminder_scheduler = TimerScheduler(send_lesson_reminder)
+
+# функция для отключения подписок пользователей, чьи чаты больше недоступны
+async def deactivate_unreachable_chats(user_ids):
+    async with aiosqlite.connect('schedule.db') as db:
+        await db.executemany('UPDATE subscriptions SET active = 0 WHERE user_id = ?', ((user_id,) for user_id in user_ids))
+        await db.commit()
+    for user_id in user_ids:
+        await refresh_user_reminders(user_id)
+    logging.info(f"Отключены подписки недоступных чатов: {len(user_ids)}")
+
+# функция для получения языка пользователя для сообщений вне обработчиков (рассылка, напоминания):
+# язык из последнего сообщения пользователя, иначе сохранённый в базе данных
+def user_locale(user_id: int, stored_locale=None):
+    return resolve_locale(activity_tracker.languages.get(user_id, stored_locale))
+
+# функция для записи накопленных отметок активности, по одной строке на пользователя
+async def flush_user_activity():
+    last_seen = activity_tracker.drain()
+    if not last_seen:
+        return
+    async with aiosqlite.connect('schedule.db') as db:
+        await db.executemany(
+            '''INSERT INTO user_activity (user_id, last_seen, locale) VALUES (?, ?, ?)
+               ON CONFLICT(user_id) DO UPDATE SET last_seen = max(last_seen, excluded.last_seen),
+                                                  locale = coalesce(excluded.locale, locale)''',
+            ((user_id, seen, activity_tracker.languages.get(user_id)) for user_id, seen in last_seen.items())
+        )
+        await db.commit()
+
+# функция для возврата из архива данных пользователя, который снова написал боту
+async def restore_archived_user(user_id: int):
+    async with aiosqlite.connect('schedule.db') as db:
+        cursor = await db.execute(
+            'SELECT EXISTS (SELECT 1 FROM schedule_archive WHERE user_id = ?) OR EXISTS (SELECT 1 FROM subscriptions_archive WHERE user_id = ?)',
+            (user_id, user_id)
+        )
+        if not (await cursor.fetchone())[0]:
+            return
+        await db.execute('BEGIN IMMEDIATE')
+        await db.execute(
+            '''INSERT OR IGNORE INTO schedule (id, user_id, week_day, lesson_time, lesson_name, teacher_name, classroom)
+               SELECT id, user_id, week_day, lesson_time, lesson_name, teacher_name, classroom FROM schedule_archive WHERE user_id = ?''',
+            (user_id,)
+        )
+        await db.execute(
+            '''INSERT OR IGNORE INTO lesson_rules (lesson_id, week_parity, start_date, end_date, exceptions, semester_start, bitmap)
+               SELECT lesson_id, week_parity, start_date, end_date, exceptions, semester_start, bitmap FROM lesson_rules_archive
+               WHERE lesson_id IN (SELECT id FROM schedule_archive WHERE user_id = ?)''',
+            (user_id,)
+        )
+        await db.execute('DELETE FROM lesson_rules_archive WHERE lesson_id IN (SELECT id FROM schedule_archive WHERE user_id = ?)', (user_id,))
+        await db.execute('DELETE FROM schedule_archive WHERE user_id = ?', (user_id,))
+        # правила могли попасть в архив в прошлом семестре
+        await rebuild_lesson_bitmaps(db)
+        await db.execute(
+            '''INSERT OR IGNORE INTO subscriptions (user_id, active, notification_time, timezone)
+               SELECT user_id, active, notification_time, timezone FROM subscriptions_archive WHERE user_id = ?''',
+            (user_id,)
+        )
+        await db.execute('DELETE FROM subscriptions_archive WHERE user_id = ?', (user_id,))
+        await db.commit()
+    await refresh_user_reminders(user_id)
+    logging.info(f"Данные пользователя {user_id} возвращены из архива.")
+
+# функция для обслуживания базы данных: архивирование давно неактивных пользователей,
+# возврат свободных страниц и обновление статистики планировщика запросов
+async def run_maintenance():
+    await flush_user_activity()
+    today = datetime.utcnow().date()
+    cutoff = (today - timedelta(days=STALE_USER_DAYS)).isoformat()
+    archived_at = datetime.utcnow().isoformat(timespec='seconds')
+
+    async with aiosqlite.connect('schedule.db') as db:
+        await db.execute('BEGIN IMMEDIATE')
+        # пользователи, у которых ещё нет отметки активности, отсчитывают срок с сегодняшнего дня
+        await db.execute(
+            'INSERT OR IGNORE INTO user_activity (user_id, last_seen) SELECT user_id, ? FROM schedule UNION SELECT user_id, ? FROM subscriptions',
+            (today.isoformat(), today.isoformat())
+        )
+        # в архив уходят только пользователи без активной подписки
+        cursor = await db.execute(
+            '''SELECT a.user_id FROM user_activity a
+               WHERE a.last_seen < ? AND NOT EXISTS (SELECT 1 FROM subscriptions s WHERE s.user_id = a.user_id AND s.active = 1)''',
+            (cutoff,)
+        )
+        stale_users = [row[0] for row in await cursor.fetchall()]
+        params = [(user_id,) for user_id in stale_users]
+        await db.executemany(
+            '''INSERT OR REPLACE INTO schedule_archive (id, user_id, week_day, lesson_time, lesson_name, teacher_name, classroom, archived_at)
+               SELECT id, user_id, week_day, lesson_time, lesson_name, teacher_name, classroom, ? FROM schedule WHERE user_id = ?''',
+            [(archived_at, user_id) for user_id in stale_users]
+        )
+        # правила повторения уходят в архив вместе с занятиями
+        await db.executemany(
+            '''INSERT OR REPLACE INTO lesson_rules_archive (lesson_id, week_parity, start_date, end_date, exceptions, semester_start, bitmap)
+               SELECT lesson_id, week_parity, start_date, end_date, exceptions, semester_start, bitmap FROM lesson_rules
+               WHERE lesson_id IN (SELECT id FROM schedule WHERE user_id = ?)''',
+            params
+        )
+        await db.executemany('DELETE FROM lesson_rules WHERE lesson_id IN (SELECT id FROM schedule WHERE user_id = ?)', params)
+        await db.executemany('DELETE FROM schedule WHERE user_id = ?', params)
+        await db.executemany(
+            '''INSERT OR REPLACE INTO subscriptions_archive (user_id, active, notification_time, timezone, archived_at)
+               SELECT user_id, active, notification_time, timezone, ? FROM subscriptions WHERE user_id = ?''',
+            [(archived_at, user_id) for user_id in stale_users]
+        )
+        await db.executemany('DELETE FROM subscriptions WHERE user_id = ?', params)
+        await db.executemany('DELETE FROM user_activity WHERE user_id = ?', params)
+        await db.commit()
+
+        # каждый шаг incremental_vacuum освобождает одну страницу, поэтому читаем результат целиком
+        cursor = await db.execute(f'PRAGMA incremental_vacuum({VACUUM_PAGES})')
+        await cursor.fetchall()
+        await db.execute('ANALYZE')
+        await db.commit()
+
+    activity_tracker.forget(stale_users)
+    logging.info(f"Обслуживание базы данных завершено, в архив перенесено пользователей: {len(stale_users)}")
+    return len(stale_users)
+
+# обработчик команды /maintenance для ручного запуска обслуживания базы данных
+@dp.message_handler(commands=['maintenance'], state='*')
+async def maintenance_command(message: types.Message):
+    user_id = message.from_user.id
+    if user_id == ADMIN_ID:
+        archived = await run_maintenance()
+        await message.answer(_("Обслуживание базы данных завершено. В архив перенесено пользователей: {archived}.").format(archived=archived))
+    else:
+        await message.answer(_("У вас нет прав для использования этой команды."))
+
+activity_tracker = ActivityMiddleware(on_first_seen=restore_archived_user)
+dp.middleware.setup(activity_tracker)
 
 # функция для запуска планировщика задач
 async def scheduler():
+    last_maintenance = None
     while True:
         await check_and_send_notifications()
+        await flush_user_activity()
+        # обслуживание базы данных раз в сутки, в час наименьшей нагрузки
+        utc_now = datetime.utcnow()
+        if utc_now.hour == MAINTENANCE_HOUR and last_maintenance != utc_now.date():
+            last_maintenance = utc_now.date()
+            asyncio.create_task(run_maintenance())
         await asyncio.sleep(60) # ждем одну минуту перед следующей проверкой
 
 
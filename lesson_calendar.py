@@ -0,0 +1,132 @@
+# Правила повторения занятий (чётность недели, период, даты отмены) и их
+# представление в виде битовой карты дней семестра.
+#
+# Бит с номером N в карте означает, что занятие проводится в день semester_start + N.
+# Карта строится один раз при сохранении правила, поэтому проверка
+# «проводится ли занятие в дату X» сводится к чтению одного бита.
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from localization import _, __
+
+PARITY_ANY = 0
+PARITY_ODD = 1
+PARITY_EVEN = 2
+PARITY_NAMES = {
+    'все': PARITY_ANY,
+    'нечёт': PARITY_ODD,
+    'нечет': PARITY_ODD,
+    'чёт': PARITY_EVEN,
+    'чет': PARITY_EVEN,
+    'all': PARITY_ANY,
+    'odd': PARITY_ODD,
+    'even': PARITY_EVEN,
+}
+PARITY_TITLES = {PARITY_ANY: __('все'), PARITY_ODD: __('нечёт'), PARITY_EVEN: __('чёт')}
+DATE_FORMAT = '%d.%m.%Y'
+
+# parity — PARITY_*, start_date и end_date — date или None, exceptions — frozenset дат отмены
+Rule = namedtuple('Rule', ['parity', 'start_date', 'end_date', 'exceptions'])
+WEEKLY = Rule(PARITY_ANY, None, None, frozenset())
+
+
+def parse_date(text):
+    try:
+        return datetime.strptime(text.strip(), DATE_FORMAT).date()
+    except ValueError:
+        raise ValueError(_("Некорректная дата: {date}. Используйте формат ДД.ММ.ГГГГ.").format(date=text.strip()))
+
+
+# функция для разбора правила из текста вида "нечёт; 01.09.2026-25.12.2026; 04.11.2026, 31.12.2026"
+def parse_rule(text):
+    parts = [part.strip() for part in text.split(';')]
+    if len(parts) != 3:
+        raise ValueError(_("Правило должно состоять из трёх частей, разделённых точкой с запятой."))
+    parity_text, period_text, exceptions_text = parts
+
+    parity = PARITY_NAMES.get(parity_text.lower())
+    if parity is None:
+        raise ValueError(_("Неделя должна быть одной из: все, чёт, нечёт."))
+
+    start_date = end_date = None
+    if period_text != '-':
+        start_text, separator, end_text = period_text.partition('-')
+        if not separator:
+            raise ValueError(_("Период указывается как ДД.ММ.ГГГГ-ДД.ММ.ГГГГ или '-'."))
+        start_date, end_date = parse_date(start_text), parse_date(end_text)
+        if end_date < start_date:
+            raise ValueError(_("Дата окончания периода раньше даты начала."))
+
+    if exceptions_text == '-':
+        exceptions = frozenset()
+    else:
+        exceptions = frozenset(parse_date(item) for item in exceptions_text.split(','))
+    return Rule(parity, start_date, end_date, exceptions)
+
+
+# функция для представления правила в том же текстовом формате, что принимает parse_rule
+def format_rule(rule):
+    period = '-'
+    if rule.start_date is not None:
+        period = f"{rule.start_date.strftime(DATE_FORMAT)}-{rule.end_date.strftime(DATE_FORMAT)}"
+    exceptions = ', '.join(day.strftime(DATE_FORMAT) for day in sorted(rule.exceptions)) or '-'
+    return f"{PARITY_TITLES[rule.parity]}; {period}; {exceptions}"
+
+
+# номер учебной недели, первая неделя — та, в которую попадает начало семестра
+def week_number(day, semester_start):
+    first_monday = semester_start - timedelta(days=semester_start.weekday())
+    return (day - first_monday).days // 7 + 1
+
+
+def rule_matches(rule, weekday, day, semester_start):
+    if day.weekday() != weekday:
+        return False
+    if rule.start_date is not None and not rule.start_date <= day <= rule.end_date:
+        return False
+    if rule.parity != PARITY_ANY and week_number(day, semester_start) % 2 != rule.parity % 2:
+        return False
+    return day not in rule.exceptions
+
+
+# функция для построения битовой карты занятия на weeks недель от начала семестра
+def build_bitmap(rule, weekday, semester_start, weeks):
+    days = weeks * 7
+    bitmap = bytearray((days + 7) // 8)
+    for offset in range((weekday - semester_start.weekday()) % 7, days, 7):
+        if rule_matches(rule, weekday, semester_start + timedelta(days=offset), semester_start):
+            bitmap[offset >> 3] |= 1 << (offset & 7)
+    return bytes(bitmap)
+
+
+# функция для проверки, попадает ли день в окно, которое покрывает битовая карта
+def bitmap_covers(bitmap, semester_start, day):
+    return 0 <= (day - semester_start).days < len(bitmap) * 8
+
+
+# функция для проверки по битовой карте, проводится ли занятие в указанный день;
+# за пределами окна карты возвращает False, для таких дней правило проверяется через rule_matches
+def bitmap_contains(bitmap, semester_start, day):
+    offset = (day - semester_start).days
+    if offset < 0 or offset >= len(bitmap) * 8:
+        return False
+    return bool(bitmap[offset >> 3] >> (offset & 7) & 1)
+
+
+# функции для хранения правила в базе данных: даты в формате ISO, даты отмены через запятую
+def dump_rule(rule):
+    return (
+        rule.parity,
+        rule.start_date.isoformat() if rule.start_date else None,
+        rule.end_date.isoformat() if rule.end_date else None,
+        ','.join(day.isoformat() for day in sorted(rule.exceptions)),
+    )
+
+
+def load_rule(parity, start_date, end_date, exceptions):
+    return Rule(
+        parity,
+        date.fromisoformat(start_date) if start_date else None,
+        date.fromisoformat(end_date) if end_date else None,
+        frozenset(date.fromisoformat(day) for day in exceptions.split(',') if day),
+    )
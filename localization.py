@@ -0,0 +1,82 @@
+# Локализация бота: каталоги сообщений Babel/gettext и названия дней недели.
+#
+# Исходные строки в коде написаны по-русски, поэтому русский — язык по умолчанию
+# и отдельного каталога для него нет. Остальные языки лежат в locales/ в виде
+# скомпилированных каталогов (.mo), которые загружаются один раз при запуске;
+# поиск перевода — обращение к словарю каталога.
+#
+# Обновление каталогов после изменения строк:
+#   pybabel extract -F babel.cfg -k __ -o locales/messages.pot .
+#   pybabel update -i locales/messages.pot -d locales -D messages
+#   pybabel compile -d locales -D messages
+#
+# В базе данных дни недели хранятся под постоянными английскими именами
+# (WEEK_DAYS), а пользователю показываются названия из данных CLDR для его языка,
+# поэтому ни проверка ввода, ни хранение не зависят от локали процесса и strftime.
+import os
+
+from aiogram.contrib.middlewares.i18n import I18nMiddleware
+from babel.dates import get_day_names
+from babel.localedata import locale_identifiers
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locales')
+DEFAULT_LOCALE = 'ru'
+# названия дней недели для хранения в базе данных, индекс совпадает с date.weekday()
+WEEK_DAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+SCHOOL_DAYS = 6  # занятия бывают с понедельника по субботу
+
+i18n = I18nMiddleware('messages', LOCALES_DIR, default=DEFAULT_LOCALE)
+_ = i18n.gettext
+__ = i18n.lazy_gettext
+
+
+# функция для получения языка, для которого есть каталог (иначе язык по умолчанию);
+# принимает и коды вида 'en-US', которые Telegram передаёт в language_code
+def resolve_locale(language=None):
+    if language is None:
+        language = i18n.ctx_locale.get()
+    if language:
+        language = language.split('-')[0].lower()
+    return language if language in i18n.locales else DEFAULT_LOCALE
+
+
+def _week_day_titles(locale):
+    names = get_day_names('wide', context='stand-alone', locale=locale)
+    return tuple(names[index][:1].upper() + names[index][1:] for index in range(len(WEEK_DAYS)))
+
+
+# названия дней недели для каждого языка и обратный словарь для разбора ввода,
+# в котором также принимаются имена из WEEK_DAYS
+WEEK_DAY_TITLES = {locale: _week_day_titles(locale) for locale in (DEFAULT_LOCALE, *i18n.available_locales)}
+WEEK_DAY_LOOKUP = {
+    locale: {
+        **{name.lower(): index for index, name in enumerate(WEEK_DAYS)},
+        **{title.lower(): index for index, title in enumerate(titles)},
+    }
+    for locale, titles in WEEK_DAY_TITLES.items()
+}
+
+
+# функция для получения названия дня недели на языке пользователя
+def week_day_title(week_day, locale=None):
+    return WEEK_DAY_TITLES[resolve_locale(locale)][WEEK_DAYS.index(week_day)]
+
+
+# функция для разбора введённого дня недели; возвращает номер дня (0 — понедельник) или None
+def parse_week_day(text, locale=None):
+    return WEEK_DAY_LOOKUP[resolve_locale(locale)].get(text.strip().lower())
+
+
+# функция для распознавания дня недели на любом языке, например сохранённого через strftime
+# в локали сервера; сначала проверяются языки бота, затем названия дней из всех локалей CLDR
+def parse_any_week_day(text):
+    key = text.strip().lower()
+    for lookup in WEEK_DAY_LOOKUP.values():
+        if key in lookup:
+            return lookup[key]
+    for identifier in locale_identifiers():
+        for context in ('format', 'stand-alone'):
+            for index, name in get_day_names('wide', context=context, locale=identifier).items():
+                if name.lower() == key:
+                    return index
+    return None
@@ -0,0 +1,69 @@
+# Сэмплирующий профилировщик для диагностики бота в продакшене.
+#
+# Пока профилирование выключено, никаких хуков и потоков нет, поэтому накладных
+# расходов тоже нет. При включении запускается фоновый поток, который с заданным
+# интервалом снимает стеки всех потоков процесса через sys._current_frames()
+# (цикл событий, обработчики, планировщик и рабочие потоки aiosqlite) и
+# накапливает их в формате collapsed stacks, который понимают flamegraph.pl,
+# speedscope и inferno.
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+DEFAULT_INTERVAL = 0.005  # интервал между сэмплами в секундах
+
+
+class StackSampler:
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.counts = Counter()
+        self.samples = 0
+        self.started_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self.running:
+            raise RuntimeError("Профилирование уже запущено")
+        self.counts.clear()
+        self.samples = 0
+        self.started_at = time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        own_ident = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(thread_names.get(ident, str(ident)))
+            self.counts[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def collapsed(self):
+        # формат collapsed stacks: "поток;внешняя функция;...;внутренняя функция количество"
+        return ''.join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
@@ -0,0 +1,82 @@
+# Планировщик напоминаний о занятиях в памяти процесса.
+#
+# Таймеры хранятся в двоичной куче по времени срабатывания. Отмена и перенос
+# таймера не трогают кучу: у каждого ключа есть номер поколения, и устаревшие
+# записи просто пропускаются при извлечении. Поэтому вставка, перенос и отмена
+# не требуют перестройки кучи, а цикл ожидания спит ровно до ближайшего таймера,
+# что даёт точность срабатывания в пределах долей секунды.
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+
+class TimerScheduler:
+    def __init__(self, callback):
+        # callback(key, when, payload) — корутина, вызываемая при срабатывании таймера
+        self.callback = callback
+        self._heap = []
+        self._timers = {}  # key -> (when, generation, payload)
+        self._generations = itertools.count()
+        self._wakeup = asyncio.Event()
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def schedule(self, key, when, payload=None):
+        generation = next(self._generations)
+        self._timers[key] = (when, generation, payload)
+        heapq.heappush(self._heap, (when, generation, key))
+        self._compact()
+        # будим цикл, только если новый таймер сработает раньше текущего ближайшего
+        if self._heap[0][1] == generation:
+            self._wakeup.set()
+
+    def cancel(self, key):
+        self._timers.pop(key, None)
+        self._compact()
+
+    def _compact(self):
+        # если устаревших записей стало больше, чем живых, пересобираем кучу
+        if len(self._heap) > 2 * len(self._timers) + 64:
+            self._heap = [(when, generation, key) for key, (when, generation, _) in self._timers.items()]
+            heapq.heapify(self._heap)
+
+    def clear(self):
+        self._timers.clear()
+        self._heap.clear()
+        self._wakeup.set()
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            when, generation, key = heapq.heappop(self._heap)
+            timer = self._timers.get(key)
+            if timer is not None and timer[1] == generation:
+                del self._timers[key]
+                due.append((key, when, timer[2]))
+        # выбрасываем устаревшие записи с вершины кучи, чтобы не просыпаться из-за них
+        while self._heap and self._timers.get(self._heap[0][2], (None, None))[1] != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        return due
+
+    async def _fire(self, key, when, payload):
+        try:
+            await self.callback(key, when, payload)
+        except Exception as e:
+            logging.error(f"Ошибка при обработке таймера {key}: {e}")
+
+    async def run(self):
+        while True:
+            for key, when, payload in self._pop_due(time.time()):
+                asyncio.create_task(self._fire(key, when, payload))
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,64 @@
+# Сборка длинных ответов: текст упаковывается в минимальное число сообщений
+# с разбиением по границам блоков (например, дней расписания) и строк, а слишком
+# большой ответ отправляется одним файлом вместо серии сообщений.
+import io
+
+from aiogram import types
+
+MESSAGE_LIMIT = 4096  # максимальная длина сообщения для Telegram
+DOCUMENT_THRESHOLD = 4 * MESSAGE_LIMIT  # начиная с какого объёма ответ отправляется файлом
+
+
+def _split_lines(text, limit):
+    # разбиваем блок на строки, а слишком длинные строки — на части по limit символов
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            yield line[:limit]
+            line = line[limit:]
+        if line:
+            yield line
+
+
+class ReplyBuilder:
+    def __init__(self, message_limit=MESSAGE_LIMIT, document_threshold=DOCUMENT_THRESHOLD, document_name='reply.txt'):
+        self.message_limit = message_limit
+        self.document_threshold = document_threshold
+        self.document_name = document_name
+        self.blocks = []
+        self.length = 0
+
+    # блок по возможности не разрывается между сообщениями
+    def add_block(self, text):
+        self.blocks.append(text)
+        self.length += len(text)
+
+    def text(self):
+        return ''.join(self.blocks)
+
+    # жадная упаковка блоков в сообщения; блок длиннее сообщения упаковывается построчно
+    def pack(self):
+        chunk = ''
+        for block in self.blocks:
+            pieces = (block,) if len(block) <= self.message_limit else _split_lines(block, self.message_limit)
+            for piece in pieces:
+                if chunk and len(chunk) + len(piece) > self.message_limit:
+                    yield chunk
+                    chunk = ''
+                chunk += piece
+        if chunk:
+            yield chunk
+
+    # отправка ответа на сообщение; reply_markup и прочие параметры относятся к последнему сообщению
+    async def answer(self, message: types.Message, **kwargs):
+        if self.length > self.document_threshold:
+            document = types.InputFile(io.BytesIO(self.text().encode('utf-8')), filename=self.document_name)
+            return [await message.answer_document(document, **kwargs)]
+
+        # части отправляются строго по очереди: Telegram показывает сообщения в порядке получения
+        # запросов, поэтому следующая отправка начинается только после ответа на предыдущую
+        chunks = [chunk for chunk in (chunk.rstrip() for chunk in self.pack()) if chunk]
+        sent = []
+        for index, chunk in enumerate(chunks):
+            options = kwargs if index == len(chunks) - 1 else {}
+            sent.append(await message.answer(chunk, **options))
+        return sent
@@ -1,38 +1,40 @@
+from localization import __
+
 negative_replies = [
-    "Чувствуется ваше разочарование. Трудно, когда вещи не идут так, как мы надеемся. Хотите поговорить о том, что произошло?",
-    "Мне жаль слышать, что вы чувствуете себя плохо. Жизнь может быть сложной, но я здесь, чтобы поболтать, если вам нужен внимательный слушатель.",
-    "Похоже, есть некоторое разочарование. Сообщите мне, если хотите поделиться тем, что у вас на уме.",
-    "Я здесь для вас. Если у вас трудный период, выражение чувств иногда может сделать его немного легче.",
-    "Чувствуется некоторое несчастье. Есть что-то конкретное, что вас беспокоит и о чем вы хотели бы поговорить?",
-    "Мне жаль слышать, что сейчас трудные времена. Иногда разговор об этом может помочь облегчить бремя.",
-    "Похоже, вы переживаете трудный момент. Я здесь, чтобы поддержать вас любым удобным способом.",
-    "Я здесь, если вам нужно выговориться. Нормально чувствовать себя плохо, и я здесь, чтобы слушать без суждений.",
-    "Я вижу, что вас что-то беспокоит. Если хотите поделиться, я здесь, чтобы предложить поддержку.",
-    "Мне жаль слышать, что вы сталкиваетесь с трудностями. Мы можем делать это пошагово. О чем вы думаете?"
+    __("Чувствуется ваше разочарование. Трудно, когда вещи не идут так, как мы надеемся. Хотите поговорить о том, что произошло?"),
+    __("Мне жаль слышать, что вы чувствуете себя плохо. Жизнь может быть сложной, но я здесь, чтобы поболтать, если вам нужен внимательный слушатель."),
+    __("Похоже, есть некоторое разочарование. Сообщите мне, если хотите поделиться тем, что у вас на уме."),
+    __("Я здесь для вас. Если у вас трудный период, выражение чувств иногда может сделать его немного легче."),
+    __("Чувствуется некоторое несчастье. Есть что-то конкретное, что вас беспокоит и о чем вы хотели бы поговорить?"),
+    __("Мне жаль слышать, что сейчас трудные времена. Иногда разговор об этом может помочь облегчить бремя."),
+    __("Похоже, вы переживаете трудный момент. Я здесь, чтобы поддержать вас любым удобным способом."),
+    __("Я здесь, если вам нужно выговориться. Нормально чувствовать себя плохо, и я здесь, чтобы слушать без суждений."),
+    __("Я вижу, что вас что-то беспокоит. Если хотите поделиться, я здесь, чтобы предложить поддержку."),
+    __("Мне жаль слышать, что вы сталкиваетесь с трудностями. Мы можем делать это пошагово. О чем вы думаете?")
 ]
 
 positive_replies = [
-    "Чувствуется ваш восторг в словах! Замечательные новости. Что вас так радует?",
-    "Ваша радость заразительна! Я так рад за вас. Хотите поделиться хорошими новостями?",
-    "Чувствуется много позитива от вас! Должно быть, случилось что-то замечательное. Давайте отметим это вместе!",
-    "Очевидно, что вы хорошего настроения! Мне бы хотелось узнать больше о том, что вас так радует.",
-    "Ваш энтузиазм ощутим! Я здесь, чтобы отметить ваши успехи. Что приносит вам столько радости?",
-    "Чувствуется позитивная энергия! Что бы вы ни переживали, я здесь, чтобы разделить этот восторг с вами.",
-    "Ваше счастье лучит сквозь разговор! Я здесь, чтобы пообщаться и насладиться позитивом вместе с вами. Что происходит?",
-    "Я в восторге от вашей позитивной энергии! Должны происходить хорошие вещи. Расскажите хорошие новости!",
-    "Ваша позитивность лучит сквозь беседу! Мне бы хотелось услышать больше о том, что приносит вам такую радость.",
-    "Ваш бодрый настрой вдохновляет! Я здесь, чтобы слушать и праздновать вместе с вами. Что приносит вам так много радости сегодня?"
+    __("Чувствуется ваш восторг в словах! Замечательные новости. Что вас так радует?"),
+    __("Ваша радость заразительна! Я так рад за вас. Хотите поделиться хорошими новостями?"),
+    __("Чувствуется много позитива от вас! Должно быть, случилось что-то замечательное. Давайте отметим это вместе!"),
+    __("Очевидно, что вы хорошего настроения! Мне бы хотелось узнать больше о том, что вас так радует."),
+    __("Ваш энтузиазм ощутим! Я здесь, чтобы отметить ваши успехи. Что приносит вам столько радости?"),
+    __("Чувствуется позитивная энергия! Что бы вы ни переживали, я здесь, чтобы разделить этот восторг с вами."),
+    __("Ваше счастье лучит сквозь разговор! Я здесь, чтобы пообщаться и насладиться позитивом вместе с вами. Что происходит?"),
+    __("Я в восторге от вашей позитивной энергии! Должны происходить хорошие вещи. Расскажите хорошие новости!"),
+    __("Ваша позитивность лучит сквозь беседу! Мне бы хотелось услышать больше о том, что приносит вам такую радость."),
+    __("Ваш бодрый настрой вдохновляет! Я здесь, чтобы слушать и праздновать вместе с вами. Что приносит вам так много радости сегодня?")
 ]
 
 mixed_replies = [
-    "Похоже, вы застряли между двумя эмоциями. Принятие решений может быть сложным. Хотите исследовать конфликтующие чувства вместе?",
-    "Чувствуется смесь эмоций. Жизнь полна сложных ситуаций. Если хотите, мы можем разобрать это и обсудить каждый аспект.",
-    "Навигация в конфликтующих чувствах может быть сложной. Я здесь, чтобы помочь вам разобраться, если хотите поделиться больше.",
-    "Похоже, эмоционально у вас сейчас много на тарелке. Я здесь, чтобы предоставить поддержку и понимание, когда вы с этим разбираетесь.",
-    "Смешанные эмоции могут быть подавляющими. Если вам удобно, мы можем рассмотреть каждое чувство и найти некоторую ясность.",
-    "Решения часто вызывают смешанные эмоции. Давайте поговорим о различных аспектах, и, возможно, мы сможем разобраться вместе.",
-    "Чувствуется борьба между разными эмоциями. Нормально быть неуверенным. Мы можем рассмотреть варианты и найти путь вперед вместе.",
-    "Эмоции могут быть сложными, особенно когда они конфликтуют. Я здесь, чтобы помочь вам разобраться и внести смысл в них.",
-    "Похоже, у вас возник конфликт эмоций. Хорошо быть неуверенным. Мы можем рассмотреть варианты и найти решение.",
-    "Смешанные чувства - это абсолютно нормально. Если вам удобно, мы можем поговорить о каждой эмоции и посмотреть, к чему это нас приведет."
+    __("Похоже, вы застряли между двумя эмоциями. Принятие решений может быть сложным. Хотите исследовать конфликтующие чувства вместе?"),
+    __("Чувствуется смесь эмоций. Жизнь полна сложных ситуаций. Если хотите, мы можем разобрать это и обсудить каждый аспект."),
+    __("Навигация в конфликтующих чувствах может быть сложной. Я здесь, чтобы помочь вам разобраться, если хотите поделиться больше."),
+    __("Похоже, эмоционально у вас сейчас много на тарелке. Я здесь, чтобы предоставить поддержку и понимание, когда вы с этим разбираетесь."),
+    __("Смешанные эмоции могут быть подавляющими. Если вам удобно, мы можем рассмотреть каждое чувство и найти некоторую ясность."),
+    __("Решения часто вызывают смешанные эмоции. Давайте поговорим о различных аспектах, и, возможно, мы сможем разобраться вместе."),
+    __("Чувствуется борьба между разными эмоциями. Нормально быть неуверенным. Мы можем рассмотреть варианты и найти путь вперед вместе."),
+    __("Эмоции могут быть сложными, особенно когда они конфликтуют. Я здесь, чтобы помочь вам разобраться и внести смысл в них."),
+    __("Похоже, у вас возник конфликт эмоций. Хорошо быть неуверенным. Мы можем рассмотреть варианты и найти решение."),
+    __("Смешанные чувства - это абсолютно нормально. Если вам удобно, мы можем поговорить о каждой эмоции и посмотреть, к чему это нас приведет.")
 ]
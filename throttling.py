@@ -0,0 +1,81 @@
+# Ограничение частоты запросов пользователей (token bucket) для защиты цикла событий
+# и квоты AWS от пользователей, которые засыпают бота сообщениями.
+import time
+from collections import namedtuple
+
+from aiogram import types
+from aiogram.dispatcher import Dispatcher
+from aiogram.dispatcher.handler import CancelHandler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+# rate — сколько токенов восстанавливается в секунду, burst — ёмкость корзины
+Limit = namedtuple('Limit', ['rate', 'burst'])
+
+
+# хранилище корзин токенов с автоматическим удалением устаревших записей.
+# Для каждого ключа хранится кортеж (токены, время обновления, время заполнения корзины).
+# Полная корзина ничем не отличается от отсутствующей, поэтому такие записи периодически
+# удаляются и словарь содержит только тех пользователей, которые недавно что-то присылали.
+class TokenBuckets:
+    def __init__(self, sweep_interval=60.0):
+        self.sweep_interval = sweep_interval
+        self._buckets = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def consume(self, key, limit, now=None):
+        now = time.monotonic() if now is None else now
+        if now >= self._next_sweep:
+            self._sweep(now)
+        entry = self._buckets.get(key)
+        if entry is None:
+            tokens = limit.burst
+        else:
+            tokens = min(limit.burst, entry[0] + (now - entry[1]) * limit.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now, now + (limit.burst - tokens) / limit.rate)
+        return allowed
+
+    def _sweep(self, now):
+        expired = [key for key, entry in self._buckets.items() if entry[2] <= now]
+        for key in expired:
+            del self._buckets[key]
+        self._next_sweep = now + self.sweep_interval
+
+
+# промежуточный слой, который отбрасывает сообщения пользователей сверх лимита.
+# Лимит выбирается по команде, затем по текущему состоянию FSM, затем берётся лимит по умолчанию.
+# Вместо обработки пользователь получает короткий заготовленный ответ, но не чаще,
+# чем раз в notice_interval секунд.
+class ThrottlingMiddleware(BaseMiddleware):
+    def __init__(self, buckets, default_limit, command_limits=None, state_limits=None,
+                 notice_text="Слишком много запросов. Пожалуйста, подождите немного.", notice_interval=10.0):
+        super().__init__()
+        self.buckets = buckets
+        self.default_limit = default_limit
+        self.command_limits = command_limits or {}
+        self.state_limits = state_limits or {}
+        self.notice_text = notice_text
+        self.notice_limit = Limit(rate=1 / notice_interval, burst=1)
+
+    async def on_pre_process_message(self, message: types.Message, data: dict):
+        user_id = message.from_user.id
+        command = message.get_command(pure=True)
+        if command in self.command_limits:
+            scope, limit = command, self.command_limits[command]
+        else:
+            state = await Dispatcher.get_current().current_state(chat=message.chat.id, user=user_id).get_state()
+            if state in self.state_limits:
+                scope, limit = state, self.state_limits[state]
+            else:
+                scope, limit = None, self.default_limit
+
+        if self.buckets.consume((user_id, scope), limit):
+            return
+        if self.buckets.consume((user_id, 'notice'), self.notice_limit):
+            await message.answer(str(self.notice_text))
+        raise CancelHandler()